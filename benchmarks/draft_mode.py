@@ -0,0 +1,54 @@
+"""Compare render times, page counts and sizes of draft and full renders
+
+Usage: uv run python benchmarks/draft_mode.py [--repeat N] [SIZE ...]
+"""
+
+import argparse
+import io
+import statistics
+
+from profile_pdf.generate import _render_html_template, _render_pdf
+from profile_pdf.synthetic import BENCHMARK_SIZES, synthetic_profile
+from profile_pdf.tracing import Tracer
+
+STAGES = ("load_stylesheets", "layout", "write_pdf", "render_pdf")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sizes", type=int, nargs="*", default=BENCHMARK_SIZES[:2])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'experiences':>11} {'mode':>6} {'pages':>6} {'bytes':>10} "
+        + " ".join(f"{stage + ' [s]':>20}" for stage in STAGES)
+    )
+    for size in args.sizes:
+        html_content = _render_html_template(synthetic_profile(size))
+        totals = {}
+        for draft in (False, True):
+            durations: dict[str, list[float]] = {stage: [] for stage in STAGES}
+            for _ in range(args.repeat):
+                tracer = Tracer()
+                target = io.BytesIO()
+                _render_pdf(target, html_content, tracer=tracer, draft=draft)
+                spans = {span.name: span for span in tracer.spans}
+                for stage in STAGES:
+                    durations[stage].append(spans[stage].duration)
+
+            medians = {stage: statistics.median(durations[stage]) for stage in STAGES}
+            totals[draft] = medians["render_pdf"]
+            print(
+                f"{size:>11} {'draft' if draft else 'full':>6} "
+                f"{spans['render_pdf'].attributes['pages']:>6} "
+                f"{len(target.getvalue()):>10} "
+                + " ".join(f"{medians[stage]:>20.3f}" for stage in STAGES)
+            )
+        print(
+            f"{size:>11} draft renders are {totals[False] / totals[True]:.1f}x faster"
+        )
+
+
+if __name__ == "__main__":
+    main()
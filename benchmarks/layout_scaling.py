@@ -0,0 +1,36 @@
+"""Measure how layout time scales with the length of the work history
+
+Usage: uv run python benchmarks/layout_scaling.py [SIZE ...]
+"""
+
+import argparse
+import io
+
+from profile_pdf.generate import _render_html_template, _render_pdf
+from profile_pdf.synthetic import BENCHMARK_SIZES, synthetic_profile
+from profile_pdf.tracing import Tracer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sizes", type=int, nargs="*", default=BENCHMARK_SIZES)
+    args = parser.parse_args()
+
+    print(
+        f"{'experiences':>11} {'pages':>6} {'layout [s]':>11} {'total [s]':>10} {'ms/experience':>14}"
+    )
+    for size in args.sizes:
+        html_content = _render_html_template(synthetic_profile(size))
+        tracer = Tracer()
+        _render_pdf(io.BytesIO(), html_content, tracer=tracer)
+
+        spans = {span.name: span for span in tracer.spans}
+        render, layout = spans["render_pdf"], spans["layout"]
+        print(
+            f"{size:>11} {render.attributes['pages']:>6} {layout.duration:>11.2f} "
+            f"{render.duration:>10.2f} {1000 * layout.duration / size:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compare the time until page 1 can be displayed for a plain and a linearized PDF
+
+Both PDFs are downloaded from a local server throttled to a slow network. A viewer
+can display the first page of a linearized PDF as soon as the first page's objects
+(up to the /E offset of its linearization dictionary) have arrived. A plain PDF's
+cross-reference table is at its end, so it has to be downloaded completely first.
+
+Usage: uv run python benchmarks/linearized_pdf.py [--throttle BYTES_PER_SECOND] [PDF]
+"""
+
+import argparse
+import http.client
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from profile_pdf.generate import _main
+from profile_pdf.linearize import check_linearization, linearize
+from profile_pdf.serve import make_server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "pdf", type=Path, nargs="?", help="PDF to use instead of rendering the profile"
+    )
+    parser.add_argument("--throttle", type=int, default=100_000)
+    args = parser.parse_args()
+
+    plain = args.pdf.read_bytes() if args.pdf else _main().getvalue()
+    linearized = linearize(plain)
+    parameters = check_linearization(linearized)
+
+    with tempfile.TemporaryDirectory() as directory:
+        Path(directory, "plain.pdf").write_bytes(plain)
+        Path(directory, "linearized.pdf").write_bytes(linearized)
+        server = make_server(Path(directory), throttle=args.throttle)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        print(
+            f"{'PDF':<12} {'bytes':>9} {'page 1 bytes':>13} {'page 1 [ms]':>12} {'total [ms]':>11}"
+        )
+        for name, first_page_bytes in (
+            ("plain", len(plain)),
+            ("linearized", parameters.first_page_end),
+        ):
+            first_page, total, size = _download(
+                server.server_address, f"/{name}.pdf", first_page_bytes
+            )
+            print(
+                f"{name:<12} {size:>9} {first_page_bytes:>13} "
+                f"{1000 * first_page:>12.0f} {1000 * total:>11.0f}"
+            )
+        server.shutdown()
+
+
+def _download(
+    address: tuple, path: str, first_page_bytes: int
+) -> tuple[float, float, int]:
+    """Download a file, returning the seconds until page 1 and in total and its size"""
+    host, port = address[:2]
+    connection = http.client.HTTPConnection(str(host), int(port))
+    start = time.perf_counter()
+    connection.request("GET", path, headers={"Accept-Encoding": "identity"})
+    response = connection.getresponse()
+    received = 0
+    first_page = None
+    while chunk := response.read(1024):
+        received += len(chunk)
+        if first_page is None and received >= first_page_bytes:
+            first_page = time.perf_counter() - start
+    total = time.perf_counter() - start
+    connection.close()
+    return first_page or total, total, received
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Compare transferred bytes and response times of plain and precompressed assets
+
+Usage: uv run python benchmarks/static_assets.py [DIRECTORY]
+"""
+
+import argparse
+import http.client
+import threading
+import time
+from pathlib import Path
+
+from profile_pdf import OUTPUT_DIR
+from profile_pdf.publish import publish
+from profile_pdf.serve import make_server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory", type=Path, nargs="?", default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    manifest = publish(args.directory)
+    server = make_server(args.directory)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+
+    print(
+        f"{'asset':<24} {'request':<12} {'status':>6} {'bytes':>9} {'TTFB [ms]':>10} {'total [ms]':>11}"
+    )
+    for name, asset in manifest.assets.items():
+        requests = {
+            "identity": {"Accept-Encoding": "identity"},
+            "gzip": {"Accept-Encoding": "gzip"},
+            "br": {"Accept-Encoding": "br, gzip"},
+            # a revalidation of a cached copy doesn't transfer the body at all
+            "revalidate": {"If-None-Match": asset.identity.etag},
+        }
+        for label, headers in requests.items():
+            connection = http.client.HTTPConnection(str(host), int(port))
+            start = time.perf_counter()
+            connection.request("GET", f"/{name}", headers=headers)
+            response = connection.getresponse()
+            ttfb = time.perf_counter() - start
+            body = response.read()
+            total = time.perf_counter() - start
+            connection.close()
+            print(
+                f"{name:<24} {label:<12} {response.status:>6} {len(body):>9} "
+                f"{1000 * ttfb:>10.2f} {1000 * total:>11.2f}"
+            )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 import pathlib
 
 PACKAGE_DIR = pathlib.Path(__file__).parent
@@ -10,3 +11,6 @@ MEDIA_DIR = PACKAGE_DIR / "media"
 
 # outputs
 OUTPUT_DIR = REPO_ROOT / "public"
+
+# state shared between runs (queues, caches), e.g. on a volume in containers
+CACHE_DIR = pathlib.Path(os.environ.get("PROFILE_PDF_CACHE_DIR", REPO_ROOT / ".cache"))
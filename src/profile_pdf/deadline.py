@@ -0,0 +1,126 @@
+import datetime
+import functools
+import hashlib
+import json
+import logging
+import multiprocessing
+from collections.abc import Callable, Sequence
+from multiprocessing.connection import Connection
+from multiprocessing.context import ForkServerContext
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from . import CACHE_DIR
+from .models import Profile
+from .output import atomic_write_bytes
+from .view_models import profile_digest
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceededError(TimeoutError):
+    """A render didn't finish in time and there's no previous render to fall back to"""
+
+
+class RenderResult(BaseModel):
+    """PDF of a render with a deadline"""
+
+    pdf: bytes
+    stale: bool  # True if the render timed out and this is the last known good PDF
+    render_duration: float  # seconds
+
+
+class LastKnownGoodStore:
+    """Keeps the last successfully rendered PDF per profile and render options"""
+
+    def __init__(self, directory: Path = CACHE_DIR / "last_known_good") -> None:
+        self.directory = directory
+
+    def load(self, key: str) -> bytes | None:
+        path = self._path(key)
+        return path.read_bytes() if path.exists() else None
+
+    def save(self, key: str, pdf: bytes) -> None:
+        atomic_write_bytes(self._path(key), pdf)
+
+    def record_timeout(self, key: str, deadline: float) -> None:
+        """Append the timeout to the store's log of timeouts"""
+        entry = {
+            "at": datetime.datetime.now(tz=datetime.UTC).isoformat(),
+            "key": key,
+            "deadline": deadline,
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with (self.directory / "timeouts.jsonl").open("a") as file:
+            file.write(json.dumps(entry) + "\n")
+
+    @staticmethod
+    def key(
+        profile: Profile, pages: Sequence[int] | None = None, **options: object
+    ) -> str:
+        """Key of the renders of `profile` with the given pages and render options
+
+        Unlike the input digest of an artifact, it doesn't cover the package, so a PDF
+        rendered before an update of the code can still stand in for a timed out
+        render.
+        """
+        options["pages"] = list(pages) if pages is not None else None
+        return hashlib.sha256(
+            f"{profile_digest(profile)}:{sorted(options.items())!r}".encode()
+        ).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.pdf"
+
+
+def run_with_deadline[T](
+    function: Callable[..., T], args: tuple[Any, ...], deadline: float
+) -> T:
+    """Call `function(*args)` in a separate process and kill it after `deadline` seconds
+
+    `function`, its arguments and its result must be picklable. Exceptions raised by
+    `function` are re-raised.
+    """
+    context = _forkserver_context()
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_call, args=(function, args, sender), daemon=True)
+    process.start()
+    # only the child writes, close our copy to notice if it dies without an answer
+    sender.close()
+    try:
+        if not receiver.poll(deadline):
+            raise DeadlineExceededError(f"render exceeded its deadline of {deadline}s")
+        succeeded, value = receiver.recv()
+    except EOFError:
+        raise RuntimeError("render process died without a result") from None
+    finally:
+        receiver.close()
+        process.kill()
+        process.join()
+    if not succeeded:
+        raise value
+    return value
+
+
+@functools.cache
+def _forkserver_context() -> ForkServerContext:
+    """Context of render processes, set up when the first one is started
+
+    Renders run in processes forked from a server process that has already imported
+    the renderer. That's cheaper than spawning and safer than forking a process that
+    may have initialised Pango and its threads.
+    """
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["profile_pdf.generate"])
+    return context
+
+
+def _call(function: Callable, args: tuple[Any, ...], connection: Connection) -> None:
+    try:
+        result = (True, function(*args))
+    except Exception as exception:
+        result = (False, exception)
+    connection.send(result)
+    connection.close()
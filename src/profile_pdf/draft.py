@@ -0,0 +1,55 @@
+import io
+import logging
+from collections.abc import Callable
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# write settings of draft renders: no compression, no font subsetting
+DRAFT_WRITE_OPTIONS = {"uncompressed_pdf": True, "full_fonts": True}
+# EXIF orientations that rotate an image by 90 or 270 degrees
+_TRANSPOSING_ORIENTATIONS = {5, 6, 7, 8}
+_EXIF_ORIENTATION = 0x0112
+_PLACEHOLDER = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+    'viewBox="0 0 {width} {height}">'
+    '<rect width="{width}" height="{height}" fill="#F0F0F0"/>'
+    "</svg>"
+)
+
+
+def placeholder_images(url_fetcher: Callable[..., dict]) -> Callable[..., dict]:
+    """Wrap a URL fetcher to replace raster images by placeholders of the same size
+
+    Only the images' headers are read to get their size, so nothing is decoded, and
+    the layout stays the same.
+    """
+
+    def fetch_placeholder(url: str, *args, **kwargs) -> dict:
+        result = url_fetcher(url, *args, **kwargs)
+        mime_type = result.get("mime_type") or ""
+        if not mime_type.startswith("image/") or mime_type == "image/svg+xml":
+            return result
+
+        if "file_obj" in result:
+            with result.pop("file_obj") as file_obj:
+                result["string"] = file_obj.read()
+        width, height = _image_size(result["string"])
+        return {
+            "string": _PLACEHOLDER.format(width=width, height=height).encode(),
+            "mime_type": "image/svg+xml",
+            "redirected_url": result.get("redirected_url", url),
+        }
+
+    return fetch_placeholder
+
+
+def _image_size(data: bytes) -> tuple[int, int]:
+    """Size of an image as displayed, from its header"""
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        # WeasyPrint applies the EXIF orientation, see `image-orientation`
+        if image.getexif().get(_EXIF_ORIENTATION) in _TRANSPOSING_ORIENTATIONS:
+            width, height = height, width
+    return width, height
@@ -0,0 +1,122 @@
+import contextlib
+import functools
+import hashlib
+import importlib.metadata
+import logging
+import os
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+import weasyprint
+import weasyprint.pdf.fonts
+from weasyprint.text.ffi import ffi, harfbuzz
+
+import profile_pdf
+
+from .output import atomic_write_bytes
+from .tracing import Tracer, patch_weasyprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class FontSubsetCache:
+    """Subsetted font programs on disk, keyed by font file and glyph set
+
+    The least recently used subsets are evicted once the cache exceeds `max_bytes`.
+    Several processes can share the directory, which defaults to one in `CACHE_DIR`.
+    """
+
+    def __init__(
+        self, directory: Path | None = None, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        # looked up on use, so tests can move `CACHE_DIR` without importing WeasyPrint
+        self.directory = directory or profile_pdf.CACHE_DIR / "font_subsets"
+        self.max_bytes = max_bytes
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            # the modification time tracks the last use for the eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        atomic_write_bytes(self._path(key), data)
+        self._evict()
+
+    @staticmethod
+    def key(font_file: bytes, index: int, glyphs: Iterable[int], hinting: bool) -> str:
+        """Cache key of a subset of the `glyphs` of the `index`th font in `font_file`"""
+        digest = hashlib.sha256()
+        digest.update(_subsetter_version().encode())
+        digest.update(hashlib.sha256(font_file).digest())
+        digest.update(f"{index}:{hinting}:".encode())
+        digest.update(",".join(str(glyph) for glyph in sorted(glyphs)).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.font"
+
+    def _evict(self) -> None:
+        files = []
+        for path in self.directory.glob("*.font"):
+            with contextlib.suppress(FileNotFoundError):
+                files.append((path.stat(), path))
+        total = sum(stat.st_size for stat, _ in files)
+        # evict the least recently used subsets first
+        for stat, path in sorted(files, key=lambda file: file[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            logger.debug("Evicted font subset %s", path.name)
+
+
+@contextlib.contextmanager
+def cached_font_subsets(
+    cache: FontSubsetCache, tracer: Tracer | None = None
+) -> Iterator[None]:
+    """Reuse font subsets from `cache` while writing PDFs in the block
+
+    Fonts without glyphs are embedded whole and bypass the cache.
+    """
+    tracer = tracer or Tracer()
+    original = weasyprint.pdf.fonts.Font.subset
+
+    @functools.wraps(original)
+    def subset(font: weasyprint.pdf.fonts.Font, cmap: dict, hinting: bool) -> None:
+        # without glyphs, WeasyPrint embeds the whole font
+        if not cmap:
+            return original(font, cmap, hinting)
+
+        key = cache.key(font.file_content, font.index, cmap, hinting)
+        with tracer.span(
+            "subset_font", font=font.family.decode(), cache="font_subset"
+        ) as span:
+            subset_font = cache.get(key)
+            span.attributes["cache_hit"] = subset_font is not None
+            if subset_font is None:
+                original(font, cmap, hinting)
+                cache.put(key, font.file_content)
+            else:
+                font.file_content = subset_font
+        return None
+
+    with patch_weasyprint(weasyprint.pdf.fonts.Font, "subset", subset):
+        yield
+
+
+@functools.cache
+def _subsetter_version() -> str:
+    """Versions of everything that determines a subset's content"""
+    fonttools_version = importlib.metadata.version("fonttools")
+    harfbuzz_version = ffi.string(harfbuzz.hb_version_string()).decode()
+    return (
+        f"weasyprint {weasyprint.__version__}, fonttools {fonttools_version}, "
+        f"harfbuzz {harfbuzz_version}"
+    )
@@ -1,79 +1,506 @@
+import argparse
 import datetime
+import functools
+import hashlib
+import importlib.metadata
 import io
 import logging
+import time
 import zoneinfo
+from collections.abc import Sequence
+from enum import StrEnum
 from pathlib import Path
 
 import dotenv
 from jinja2 import Environment, FileSystemLoader, StrictUndefined
 from weasyprint import CSS, HTML
+from weasyprint.text.ffi import ffi, harfbuzz, pango
 from weasyprint.text.fonts import FontConfiguration
 
 from . import OUTPUT_DIR, REPO_ROOT, STYLES_DIR, TEMPLATES_DIR
-from .models import DEFAULT_PHONE_NUMBER, Education, Profile, WorkExperience
+from .deadline import (
+    DeadlineExceededError,
+    LastKnownGoodStore,
+    RenderResult,
+    run_with_deadline,
+)
+from .draft import DRAFT_WRITE_OPTIONS, placeholder_images
+from .font_cache import FontSubsetCache, cached_font_subsets
+from .incremental import PatchError, patch_last_updated, prints_last_updated
+from .linearize import linearize as linearize_pdf
+from .metrics import RenderMetrics
+from .models import DEFAULT_PHONE_NUMBER, Profile
+from .output import input_digest, read_manifest, write_artifact
+from .tracing import (
+    Span,
+    Tracer,
+    document_stats,
+    trace_image_loading,
+    trace_page_layout,
+    traced_url_fetcher,
+)
+from .view_models import get_render_context, render_context_cached
 
 logger = logging.getLogger(__name__)
 
 
+class Section(StrEnum):
+    """Top-level sections of the profile in document order"""
+
+    COVER_PAGE = "cover_page"
+    EXPERIENCES = "experiences"
+
+
+ALL_SECTIONS = frozenset(Section)
+
+
 def main() -> None:
-    buffer = _main()
+    parser = argparse.ArgumentParser(description="Render the profile as a PDF")
+    parser.add_argument(
+        "--pages",
+        type=_parse_page_range,
+        default=None,
+        help="1-based page or page range to render, e.g. '1' for the cover page only or '2-3'",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=OUTPUT_DIR / "profile.pdf",
+        help="path of the generated PDF",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        default=None,
+        help="export trace spans of the render as OTLP/JSON to this path",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="seconds after which the render is aborted in favour of the last good PDF",
+    )
+    parser.add_argument(
+        "--linearize",
+        action="store_true",
+        help="write a linearized PDF, so browsers can show page 1 while downloading the rest",
+    )
+    parser.add_argument(
+        "--draft",
+        action="store_true",
+        help="render fast for content review, with system fonts and image placeholders",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="render from scratch, even if only the date changed since the last render",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=None,
+        help="write render metrics in the Prometheus text format to this path",
+    )
+    args = parser.parse_args()
+
+    profile = _load_profile()
+    tracer = Tracer()
+    # counters continue from the previous run, otherwise they'd never increase
+    metrics = RenderMetrics.read(args.metrics) if args.metrics else RenderMetrics()
+    try:
+        result, outcome = _generate(
+            profile,
+            args.output,
+            tracer,
+            pages=args.pages,
+            deadline=args.deadline,
+            linearize=args.linearize,
+            draft=args.draft,
+            full=args.full,
+        )
+    except Exception:
+        metrics.observe_failure(tracer)
+        raise
+    else:
+        metrics.observe(tracer, result.pdf, outcome=outcome)
+    finally:
+        if args.metrics:
+            metrics.write(args.metrics)
 
-    # persist to disk
-    output_file = OUTPUT_DIR / "profile.pdf"
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-    output_file.write_bytes(buffer.getvalue())
+    if args.trace:
+        tracer.export(args.trace)
 
 
-def _main() -> io.BytesIO:
+def _generate(  # noqa: PLR0913
+    profile: Profile,
+    output: Path,
+    tracer: Tracer,
+    pages: Sequence[int] | None = None,
+    deadline: float | None = None,
+    linearize: bool = False,
+    draft: bool = False,
+    full: bool = False,
+    store: LastKnownGoodStore | None = None,
+) -> tuple[RenderResult, str]:
+    """Render the profile to `output`, returns the result and how it came about
+
+    Every up-to-date PDF except for drafts is kept in the last known good `store`, to
+    stand in for later renders that exceed their deadline.
+    """
+    store = store or LastKnownGoodStore()
+    today = _today()
+    digest = input_digest(
+        profile,
+        renderer=_renderer_version(),
+        pages=pages,
+        linearize=linearize,
+        draft=draft,
+    )
+    start = time.perf_counter()
+    previous = None
+    if not full:
+        with tracer.span("update_previous_render", cache="previous_render") as span:
+            previous = _update_previous_render(
+                output, digest, today, linearize=linearize, tracer=tracer
+            )
+            span.attributes["cache_hit"] = previous is not None
+
+    if previous is not None:
+        result = RenderResult(
+            pdf=previous, stale=False, render_duration=time.perf_counter() - start
+        )
+    elif deadline is None:
+        pdf = _main(
+            profile, pages=pages, tracer=tracer, linearize=linearize, draft=draft
+        ).getvalue()
+        result = RenderResult(
+            pdf=pdf, stale=False, render_duration=time.perf_counter() - start
+        )
+    else:
+        result = _render_with_deadline(
+            profile,
+            deadline,
+            pages=pages,
+            tracer=tracer,
+            store=store,
+            linearize=linearize,
+            draft=draft,
+        )
+    # drafts aren't good enough to stand in for a timed out render
+    if not result.stale and not draft:
+        store.save(store.key(profile, pages=pages, linearize=linearize), result.pdf)
+
+    # outputs without the date don't depend on it and are reused as they are, a
+    # render that crosses midnight prints the next day, which only means that the
+    # next update can't patch it
+    shows_date = not result.stale and _prints_last_updated(result.pdf, pages)
+    # persist to disk, atomically as the output directory may be read concurrently
+    write_artifact(
+        output,
+        result.pdf,
+        input_digest=digest,
+        render_duration=result.render_duration,
+        stale=result.stale,
+        last_updated=today if shows_date else None,
+    )
+    if previous is not None:
+        return result, "reused"
+    return result, "stale" if result.stale else "rendered"
+
+
+def _main(
+    profile: Profile | None = None,
+    pages: Sequence[int] | None = None,
+    tracer: Tracer | None = None,
+    linearize: bool = False,
+    draft: bool = False,
+    font_cache: FontSubsetCache | None = None,
+) -> io.BytesIO:
     target = io.BytesIO()
+    profile = profile or _load_profile()
+    tracer = tracer or Tracer()
+
+    # render HTML content from profile model, leaving out sections that can't end up
+    # on the requested pages so they don't need to be laid out at all
+    with tracer.span(
+        "render_html_template",
+        cache="render_context",
+        cache_hit=render_context_cached(profile),
+    ):
+        html_content = _render_html_template(
+            profile, sections=_sections_for_pages(pages)
+        )
+
+    # render PDF
+    _render_pdf(
+        target,
+        html_content,
+        pages=pages,
+        tracer=tracer,
+        draft=draft,
+        font_cache=font_cache,
+    )
+
+    if linearize:
+        with tracer.span("linearize"):
+            target = io.BytesIO(linearize_pdf(target.getvalue()))
+    return target
+
 
+def _render_with_deadline(
+    profile: Profile,
+    deadline: float,
+    pages: Sequence[int] | None = None,
+    tracer: Tracer | None = None,
+    store: LastKnownGoodStore | None = None,
+    linearize: bool = False,
+    draft: bool = False,
+    font_cache: FontSubsetCache | None = None,
+) -> RenderResult:
+    """Render in a separate process that's killed once the deadline passes
+
+    A render that times out falls back to the last known good PDF of the same profile,
+    pages and linearization in `store`, marked as stale. A full PDF is good enough to
+    stand in for a draft.
+    """
+    store = store or LastKnownGoodStore()
+    # the render process doesn't share this process' state, e.g. patched defaults
+    font_cache = font_cache or FontSubsetCache()
+    key = store.key(profile, pages=pages, linearize=linearize)
+    start = time.perf_counter()
+    try:
+        pdf, spans = run_with_deadline(
+            _render_to_bytes, (profile, pages, linearize, draft, font_cache), deadline
+        )
+    except DeadlineExceededError:
+        store.record_timeout(key, deadline)
+        last_known_good = store.load(key)
+        if last_known_good is None:
+            raise
+        logger.warning(
+            "Render exceeded its deadline of %ss, using the last known good PDF",
+            deadline,
+        )
+        return RenderResult(
+            pdf=last_known_good,
+            stale=True,
+            render_duration=time.perf_counter() - start,
+        )
+
+    if tracer:
+        tracer.spans.extend(spans)
+    return RenderResult(
+        pdf=pdf, stale=False, render_duration=time.perf_counter() - start
+    )
+
+
+def _update_previous_render(
+    path: Path,
+    digest: str,
+    today: datetime.date,
+    linearize: bool = False,
+    tracer: Tracer | None = None,
+) -> bytes | None:
+    """Previous render at `path` with its "Last updated" date changed to `today`
+
+    The date is patched in an incremental update instead of laying out the profile
+    again, a render that doesn't show the date is returned as it is. Returns None if
+    any other input changed or the file can't be patched, so it has to be rendered
+    from scratch.
+    """
+    tracer = tracer or Tracer()
+    artifact = read_manifest(path.parent).artifacts.get(path.name)
+    if (
+        artifact is None
+        or artifact.stale
+        or artifact.input_digest != digest
+        or not path.exists()
+    ):
+        return None
+    pdf = path.read_bytes()
+    if hashlib.sha256(pdf).hexdigest() != artifact.sha256:
+        logger.warning("%s was modified since it was rendered", path)
+        return None
+    if artifact.last_updated is None or artifact.last_updated == today:
+        return pdf
+
+    with tracer.span("patch_last_updated"):
+        try:
+            pdf = patch_last_updated(pdf, artifact.last_updated, today)
+        except PatchError as error:
+            logger.info(
+                "Rendering from scratch, as %s can't be patched: %s", path, error
+            )
+            return None
+    # the update voids the linearization, linearizing again is still fast
+    if linearize:
+        with tracer.span("linearize"):
+            pdf = linearize_pdf(pdf)
+    return pdf
+
+
+@functools.cache
+def _renderer_version() -> str:
+    """Versions of the libraries that lay out and write the PDF
+
+    After an upgrade, previous renders are laid out again instead of being patched.
+    """
+    versions = {
+        name: importlib.metadata.version(name)
+        for name in ("weasyprint", "pydyf", "fonttools", "tinycss2", "cssselect2")
+    }
+    versions["pango"] = ffi.string(pango.pango_version_string()).decode()
+    versions["harfbuzz"] = ffi.string(harfbuzz.hb_version_string()).decode()
+    return ", ".join(f"{name} {version}" for name, version in versions.items())
+
+
+def _prints_last_updated(pdf: bytes, pages: Sequence[int] | None) -> bool:
+    """Whether a render of `pages` shows the "Last updated" date at the profile's end"""
+    if Section.EXPERIENCES not in _sections_for_pages(pages):
+        return False
+    # only the requested pages know whether they include the last one
+    return pages is None or prints_last_updated(pdf)
+
+
+def _render_to_bytes(
+    profile: Profile,
+    pages: Sequence[int] | None,
+    linearize: bool = False,
+    draft: bool = False,
+    font_cache: FontSubsetCache | None = None,
+) -> tuple[bytes, list[Span]]:
+    """Render the PDF, returning it with the trace spans of the render"""
+    tracer = Tracer()
+    pdf = _main(
+        profile,
+        pages=pages,
+        tracer=tracer,
+        linearize=linearize,
+        draft=draft,
+        font_cache=font_cache,
+    ).getvalue()
+    return pdf, tracer.spans
+
+
+def _load_profile() -> Profile:
+    """Instantiate the profile, completed by private data from the .env file"""
     # Load .env file if it exists
     env_file = REPO_ROOT / ".env"
     config = dotenv.dotenv_values(env_file)
     phone_number = config.get("PHONE_NUMBER") or DEFAULT_PHONE_NUMBER
 
-    # Instantiate metadata
-    profile = Profile(phone=phone_number)
+    return Profile(phone=phone_number)
 
-    # render HTML content from profile model
-    html_content = _render_html_template(profile)
 
-    # render PDF
-    _render_pdf(target, html_content)
-    return target
+def _parse_page_range(value: str) -> range:
+    """Parse a 1-based page ("2") or inclusive page range ("2-4") into 0-based page indices"""
+    first, _, last = value.partition("-")
+    try:
+        start, end = int(first), int(last or first)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid page range: {value!r}") from None
+    if start < 1 or end < start:
+        raise argparse.ArgumentTypeError(f"invalid page range: {value!r}")
+    return range(start - 1, end)
+
+
+def _sections_for_pages(pages: Sequence[int] | None) -> frozenset[Section]:
+    """Determine which sections are needed to lay out the given 0-based pages
+
+    The cover page always fills exactly the first page. All other pages are only
+    correct if the cover page precedes them (page numbers, page breaks), so only a
+    cover-page-only request allows pruning anything.
+    """
+    if pages and all(page == 0 for page in pages):
+        return frozenset({Section.COVER_PAGE})
+    return ALL_SECTIONS
 
 
-def _render_html_template(profile: Profile) -> str:
+def _render_html_template(
+    profile: Profile, sections: frozenset[Section] = ALL_SECTIONS
+) -> str:
     """Generate HTML content from profile model using Jinja2 template"""
-    # Set up Jinja2 environment
-    env = Environment(
+    template = _jinja_environment().get_template("profile.html")
+
+    # Render template with the precomputed profile data
+    return template.render(
+        context=get_render_context(profile),
+        last_updated=_today().isoformat(),
+        sections=sections,
+    )
+
+
+def _today() -> datetime.date:
+    return datetime.datetime.now(tz=zoneinfo.ZoneInfo("Europe/Berlin")).date()
+
+
+@functools.cache
+def _jinja_environment() -> Environment:
+    """Set up the Jinja2 environment once, so its template cache can be reused"""
+    return Environment(
         loader=FileSystemLoader(TEMPLATES_DIR),
         autoescape=True,
         undefined=StrictUndefined,
     )
-    env.filters["format_duration"] = _format_duration
 
-    template = env.get_template("profile.html")
 
-    # Render template with profile data
-    today = datetime.datetime.now(tz=zoneinfo.ZoneInfo("Europe/Berlin")).date()
-    return template.render(profile=profile, today=today)
+def _render_pdf(
+    target: io.BytesIO,
+    html_content: str,
+    pages: Sequence[int] | None = None,
+    tracer: Tracer | None = None,
+    draft: bool = False,
+    font_cache: FontSubsetCache | None = None,
+) -> bytes:
+    """Generate PDF from HTML content and CSS file
 
+    If `pages` is given, only these 0-based pages are written to the PDF. A `draft`
+    uses the system's fonts instead of the bundled ones, placeholders instead of
+    images and the fastest write settings. Its pagination only matches the final PDF
+    if the bundled fonts are installed on the system, like in the Docker image.
+    Font subsets are reused from earlier renders with the same glyphs in `font_cache`,
+    by default the one in the cache directory.
+    """
+    tracer = tracer or Tracer()
+    url_fetcher = traced_url_fetcher(tracer)
+    if draft:
+        url_fetcher = placeholder_images(url_fetcher)
+    with tracer.span("render_pdf", draft=draft) as render_span:
+        with tracer.span("load_stylesheets"):
+            font_config = FontConfiguration()
+            # drafts leave out the font faces and use the fonts installed instead
+            names = ["base.css", "cover_page.css", "experiences.css"]
+            if not draft:
+                names.insert(0, "fonts.css")
+            stylesheets = [
+                CSS(
+                    filename=str(STYLES_DIR / name),
+                    font_config=font_config,
+                    url_fetcher=url_fetcher,
+                )
+                for name in names
+            ]
 
-def _format_duration(obj: WorkExperience | Education) -> str:
-    """Format duration string from an object with start and end attributes"""
-    if obj.end:
-        return f"{obj.start} - {obj.end}"
-    return f"Since {obj.start}"
+        with (
+            tracer.span("layout"),
+            trace_page_layout(tracer),
+            trace_image_loading(tracer),
+        ):
+            html_doc = HTML(
+                string=html_content, base_url=Path.cwd(), url_fetcher=url_fetcher
+            )
+            document = html_doc.render(stylesheets=stylesheets, font_config=font_config)
+        render_span.attributes.update(document_stats(document))
 
+        if pages is not None:
+            if max(pages, default=-1) >= len(document.pages):
+                raise ValueError(
+                    f"page range exceeds the document, which has {len(document.pages)} pages"
+                )
+            document = document.copy([document.pages[page] for page in pages])
 
-def _render_pdf(target: io.BytesIO, html_content: str) -> bytes:
-    """Generate PDF from HTML content and CSS file"""
-    font_config = FontConfiguration()
-    stylesheets = [
-        CSS(filename=str(STYLES_DIR / "base.css"), font_config=font_config),
-        CSS(filename=str(STYLES_DIR / "cover_page.css")),
-        CSS(filename=str(STYLES_DIR / "experiences.css")),
-    ]
-    html_doc = HTML(string=html_content, base_url=Path.cwd())
-    return html_doc.write_pdf(target, stylesheets=stylesheets, font_config=font_config)
+        with (
+            tracer.span("write_pdf"),
+            cached_font_subsets(font_cache or FontSubsetCache(), tracer),
+        ):
+            return document.write_pdf(target, **(DRAFT_WRITE_OPTIONS if draft else {}))
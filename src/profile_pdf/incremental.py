@@ -0,0 +1,205 @@
+import datetime
+import io
+import logging
+import re
+from collections.abc import Iterator
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    ByteStringObject,
+    ContentStream,
+    DictionaryObject,
+    PdfObject,
+    StreamObject,
+)
+
+logger = logging.getLogger(__name__)
+
+# text preceding the date at the end of profile.html
+LAST_UPDATED_LABEL = "Last updated: "
+# every update grows the file, past this many revisions it's better rendered again
+MAX_REVISIONS = 32
+
+_BFCHAR_SECTION = re.compile(rb"beginbfchar(?P<mappings>.*?)endbfchar", re.DOTALL)
+_BFCHAR = re.compile(rb"<(?P<code>[0-9a-fA-F]+)>\s*<(?P<text>[0-9a-fA-F]+)>")
+
+
+class PatchError(ValueError):
+    """A PDF can't be patched safely and has to be rendered again"""
+
+
+def patch_last_updated(
+    pdf: bytes, previous: datetime.date, today: datetime.date
+) -> bytes:
+    """Replace the "Last updated" date of a rendered PDF in an incremental update
+
+    Only the last page's content stream is rewritten and appended to the file, so
+    nothing has to be laid out again. The date ends the document, so a different
+    width of the new date doesn't move any other content. The glyphs of the new date
+    have to be embedded in the font subset already, otherwise a `PatchError` is raised.
+    """
+    if pdf.count(b"%%EOF") >= MAX_REVISIONS:
+        raise PatchError(f"the PDF has {MAX_REVISIONS} revisions already")
+
+    writer = PdfWriter(io.BytesIO(pdf), incremental=True)
+    page = writer.pages[-1]
+    # WeasyPrint writes a single content stream per page
+    stream = page.get("/Contents")
+    stream = stream.get_object() if stream is not None else None
+    if not isinstance(stream, StreamObject):
+        raise PatchError("the last page has no single content stream")
+    content = ContentStream(stream, writer)
+
+    resources = page["/Resources"].get_object()
+    if not isinstance(resources, DictionaryObject):
+        raise PatchError("the last page has no resources")
+    fonts = resources.get("/Font", DictionaryObject())
+    old_text = LAST_UPDATED_LABEL + previous.isoformat()
+    new_date = today.isoformat()
+    patched = 0
+    to_unicode: dict[bytes, str] | None = None
+    for index, (operands, operator) in enumerate(content.operations):
+        if operator == b"Tf":
+            to_unicode = _to_unicode(fonts[operands[0]].get_object())
+        elif operator in {b"TJ", b"Tj"} and to_unicode is not None:
+            replaced, count = _replace_text(operands[0], to_unicode, old_text, new_date)
+            if count:
+                content.operations[index] = ([replaced], b"TJ")
+                patched += count
+    if patched != 1:
+        raise PatchError(f"found {old_text!r} {patched} times instead of once")
+
+    # rewriting the existing stream object keeps the update down to this object
+    stream.set_data(content.get_data())
+    output = io.BytesIO()
+    writer.write(output)
+    logger.info("Patched last updated date from %s to %s", previous, today)
+    return output.getvalue()
+
+
+def prints_last_updated(pdf: bytes) -> bool:
+    """Whether the last page of a rendered PDF shows a "Last updated" date
+
+    Renders of pages before the end of the profile don't, so they don't depend on the
+    date. PDFs that can't be read like WeasyPrint's are assumed to show it.
+    """
+    page = PdfReader(io.BytesIO(pdf)).pages[-1]
+    content = page.get_contents()
+    resources = page.get("/Resources")
+    resources = resources.get_object() if resources is not None else None
+    if content is None or not isinstance(resources, DictionaryObject):
+        return False
+    fonts = resources.get("/Font", DictionaryObject())
+    to_unicode: dict[bytes, str] | None = None
+    try:
+        for operands, operator in content.operations:
+            if operator == b"Tf":
+                to_unicode = _to_unicode(fonts[operands[0]].get_object())
+            elif operator in {b"TJ", b"Tj"} and to_unicode is not None:
+                elements = operands[0]
+                if not isinstance(elements, ArrayObject):
+                    elements = [elements]
+                text = "".join(
+                    to_unicode.get(code, "\0")
+                    for element in elements
+                    if hasattr(element, "original_bytes")
+                    for code in _codes(element.original_bytes)
+                )
+                if LAST_UPDATED_LABEL in text:
+                    return True
+    except PatchError:
+        return True
+    return False
+
+
+def _replace_text(
+    operand: PdfObject,
+    to_unicode: dict[bytes, str],
+    old_text: str,
+    new_date: str,
+) -> tuple[ArrayObject, int]:
+    """Replace the date at the end of `old_text` in a text showing operand
+
+    Returns the operand as TJ array with the new date and the number of replacements.
+    """
+    # flatten the text into glyph codes of two bytes (Identity-H) and the glyph
+    # position adjustments in between
+    tokens: list[bytes | PdfObject] = []
+    for element in operand if isinstance(operand, ArrayObject) else [operand]:
+        if hasattr(element, "original_bytes"):
+            tokens.extend(_codes(element.original_bytes))
+        else:
+            tokens.append(element)
+    code_indices = [i for i, token in enumerate(tokens) if isinstance(token, bytes)]
+    text = [to_unicode.get(token, "\0") for token in tokens if isinstance(token, bytes)]
+
+    matches = [
+        start
+        for start in range(len(text) - len(old_text) + 1)
+        if "".join(text[start : start + len(old_text)]) == old_text
+        # glyphs of ligatures map to several characters, the date has none
+        and all(len(char) == 1 for char in text[start : start + len(old_text)])
+    ]
+    if not matches:
+        return ArrayObject(), 0
+
+    codes = _from_unicode(to_unicode)
+    try:
+        new_codes = [codes[char] for char in new_date]
+    except KeyError as error:
+        raise PatchError(
+            f"the font subset has no glyph for {error.args[0]!r}"
+        ) from None
+    # replace from the end, so the indices of earlier matches stay valid
+    for start in reversed(matches):
+        date_start = code_indices[start + len(LAST_UPDATED_LABEL)]
+        date_end = code_indices[start + len(old_text) - 1] + 1
+        tokens[date_start:date_end] = new_codes
+    return _to_array(tokens), len(matches)
+
+
+def _codes(data: bytes) -> Iterator[bytes]:
+    if len(data) % 2:
+        raise PatchError("text isn't encoded with two bytes per glyph")
+    for i in range(0, len(data), 2):
+        yield data[i : i + 2]
+
+
+def _to_array(tokens: list[bytes | PdfObject]) -> ArrayObject:
+    """Join consecutive glyph codes into strings again"""
+    array = ArrayObject()
+    string = b""
+    for token in tokens:
+        if isinstance(token, bytes):
+            string += token
+            continue
+        if string:
+            array.append(ByteStringObject(string))
+            string = b""
+        array.append(token)
+    if string:
+        array.append(ByteStringObject(string))
+    return array
+
+
+def _to_unicode(font: DictionaryObject) -> dict[bytes, str]:
+    """Map glyph codes to their text by the font's ToUnicode CMap"""
+    stream = font.get("/ToUnicode")
+    if stream is None:
+        raise PatchError(f"font {font.get('/BaseFont')} has no ToUnicode map")
+    cmap = stream.get_object().get_data()
+    return {
+        bytes.fromhex(match["code"].decode()): bytes.fromhex(
+            match["text"].decode()
+        ).decode("utf-16-be")
+        for section in _BFCHAR_SECTION.finditer(cmap)
+        for match in _BFCHAR.finditer(section["mappings"])
+    }
+
+
+def _from_unicode(to_unicode: dict[bytes, str]) -> dict[str, bytes]:
+    codes: dict[str, bytes] = {}
+    for code, text in to_unicode.items():
+        codes.setdefault(text, code)
+    return codes
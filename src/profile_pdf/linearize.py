@@ -0,0 +1,125 @@
+import logging
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# the linearization dictionary has to be the first object in the file, within the
+# first 1024 bytes (ISO 32000-1, F.2)
+_LINEARIZATION_DICT = re.compile(
+    rb"^%PDF-\d\.\d[^\n]*\n(?:%[^\n]*\n)?\s*\d+\s+0\s+obj\s*<<(?P<entries>.*?)>>",
+    re.DOTALL,
+)
+_INTEGER_ENTRY = re.compile(rb"/(?P<key>[LOENT])\s+(?P<value>\d+)")
+_HINT_STREAM_ENTRY = re.compile(rb"/H\s*\[\s*(?P<offset>\d+)\s+(?P<length>\d+)")
+# qpdf exits with 3 if it succeeded, but had warnings
+_QPDF_WARNINGS = 3
+
+
+class LinearizationError(ValueError):
+    """A PDF isn't linearized or its linearization is broken"""
+
+
+class LinearizationParameters(BaseModel):
+    """Linearization dictionary of a PDF, see ISO 32000-1, F.2"""
+
+    file_length: int  # /L
+    hint_stream_offset: int  # /H
+    hint_stream_length: int  # /H
+    first_page_object: int  # /O
+    first_page_end: int  # /E, byte offset of the end of the first page's objects
+    pages: int  # /N
+    main_xref_offset: int  # /T
+
+
+def linearize(pdf: bytes) -> bytes:
+    """Rewrite a PDF as linearized ("fast web view") PDF with qpdf
+
+    The objects of the first page are moved to the front of the file, followed by a
+    hint table, so viewers can display the first page before the rest is downloaded.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        source, target = Path(directory) / "in.pdf", Path(directory) / "out.pdf"
+        source.write_bytes(pdf)
+        # a deterministic ID keeps the output identical for identical input, so
+        # unchanged renders aren't rewritten. Warnings are about defects of the input
+        # that qpdf worked around, check_linearization validates the output.
+        _qpdf(
+            "--linearize",
+            "--deterministic-id",
+            str(source),
+            str(target),
+            allow_warnings=True,
+        )
+        linearized = target.read_bytes()
+    logger.info("Linearized PDF (%d -> %d bytes)", len(pdf), len(linearized))
+    return linearized
+
+
+def check_linearization(pdf: bytes) -> LinearizationParameters:
+    """Validate the linearization of a PDF, including its hint tables
+
+    Raises a `LinearizationError` if the PDF isn't linearized correctly.
+    """
+    parameters = linearization_parameters(pdf)
+    if parameters is None:
+        raise LinearizationError("PDF has no linearization dictionary")
+    if parameters.file_length != len(pdf):
+        # e.g. after an incremental update, which voids the linearization
+        raise LinearizationError(
+            f"linearized length {parameters.file_length} doesn't match the file's "
+            f"length {len(pdf)}"
+        )
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as file:
+        file.write(pdf)
+        file.flush()
+        # qpdf reports broken hint tables and linearization as warnings
+        _qpdf("--check-linearization", file.name)
+    return parameters
+
+
+def linearization_parameters(pdf: bytes) -> LinearizationParameters | None:
+    """Parse the linearization dictionary of a PDF, None if it isn't linearized"""
+    match = _LINEARIZATION_DICT.match(pdf[:1024])
+    if match is None or b"/Linearized" not in match["entries"]:
+        return None
+    entries = {
+        entry["key"].decode(): int(entry["value"])
+        for entry in _INTEGER_ENTRY.finditer(match["entries"])
+    }
+    hint_stream = _HINT_STREAM_ENTRY.search(match["entries"])
+    if hint_stream is None or entries.keys() != set("LOENT"):
+        raise LinearizationError("incomplete linearization dictionary")
+    return LinearizationParameters(
+        file_length=entries["L"],
+        hint_stream_offset=int(hint_stream["offset"]),
+        hint_stream_length=int(hint_stream["length"]),
+        first_page_object=entries["O"],
+        first_page_end=entries["E"],
+        pages=entries["N"],
+        main_xref_offset=entries["T"],
+    )
+
+
+def _qpdf(*args: str, allow_warnings: bool = False) -> None:
+    """Run qpdf, raising a `LinearizationError` if it fails
+
+    Warnings fail as well, unless `allow_warnings` is set.
+    """
+    executable = shutil.which("qpdf")
+    if executable is None:
+        raise RuntimeError("qpdf is required to linearize PDFs, but isn't installed")
+    result = subprocess.run(  # noqa: S603
+        [executable, *args], capture_output=True, text=True, check=False
+    )
+    if result.returncode == _QPDF_WARNINGS and allow_warnings:
+        logger.warning("qpdf %s: %s", args[0], result.stderr.strip())
+    elif result.returncode != 0:
+        raise LinearizationError(
+            f"qpdf {args[0]} failed: {result.stdout.strip()} {result.stderr.strip()}"
+        )
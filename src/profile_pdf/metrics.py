@@ -0,0 +1,280 @@
+import collections
+import logging
+import re
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+from .output import atomic_write_bytes
+from .tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "profile_pdf"
+# seconds, covering everything from a cached template to a long layout
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_SAMPLE = re.compile(rf"{PREFIX}_(?P<name>\w+)(?:\{{(?P<labels>.*)\}})? (?P<value>\S+)")
+_LABEL = re.compile(r'(?P<key>\w+)="(?P<value>(?:[^"\\]|\\.)*)"')
+# counters without labels and the attributes holding them
+_COUNTER_ATTRIBUTES = {
+    "render_failures_total": "failures",
+    "pages_total": "pages",
+    "output_bytes_total": "output_bytes",
+    "image_bytes_total": "image_bytes",
+}
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus sense"""
+
+    def __init__(self, buckets: Sequence[float] = DURATION_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RenderMetrics:
+    """Aggregates the traces of the renders of a run or batch into metrics
+
+    The metrics are written in the Prometheus text format, e.g. for node_exporter's
+    textfile collector. Values accumulate over the lifetime of the object, `read`
+    continues from the values of an earlier process.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DURATION_BUCKETS) -> None:
+        self.buckets = buckets
+        self.stage_durations: dict[str, Histogram] = {}
+        self.renders: collections.Counter[str] = collections.Counter()
+        self.failures = 0
+        self.pages = 0
+        self.output_bytes = 0
+        self.image_bytes = 0
+        self.cache_requests: collections.Counter[tuple[str, bool]] = (
+            collections.Counter()
+        )
+        self.last_run: float | None = None
+        self.last_success: float | None = None
+
+    @classmethod
+    def read(
+        cls, path: Path, buckets: Sequence[float] = DURATION_BUCKETS
+    ) -> "RenderMetrics":
+        """Continue from the metrics written to `path` before, if there are any
+
+        Counters of one-shot runs that started from zero every time would never
+        increase. An unreadable file is logged and the metrics start from zero.
+        """
+        metrics = cls(buckets)
+        try:
+            text = path.read_text()
+        except FileNotFoundError:
+            return metrics
+        try:
+            for line in text.splitlines():
+                if line and not line.startswith("#"):
+                    metrics._read_sample(line)
+        except (ValueError, KeyError):
+            logger.warning("Can't continue from the metrics in %s", path, exc_info=True)
+            return cls(buckets)
+        return metrics
+
+    def observe(self, tracer: Tracer, pdf: bytes, outcome: str = "rendered") -> None:
+        """Record a finished render by its trace and output
+
+        `outcome` tells how the PDF came about, e.g. "rendered" or "stale".
+        """
+        self._observe_spans(tracer)
+        self.renders[outcome] += 1
+        self.output_bytes += len(pdf)
+        self.last_run = self.last_success = time.time()
+
+    def observe_failure(self, tracer: Tracer | None = None) -> None:
+        """Record a failed render, with the spans it finished before failing"""
+        if tracer:
+            self._observe_spans(tracer)
+        self.failures += 1
+        self.last_run = time.time()
+
+    def write(self, path: Path) -> None:
+        """Write the metrics atomically, so collectors never read a partial file"""
+        atomic_write_bytes(path, self.to_text().encode())
+        logger.info("Wrote metrics to %s", path)
+
+    def to_text(self) -> str:
+        """Format the metrics in the Prometheus text exposition format"""
+        lines: list[str] = []
+
+        self._header(
+            lines, "stage_duration_seconds", "histogram", "Duration of render stages"
+        )
+        for stage, histogram in sorted(self.stage_durations.items()):
+            for bound, count in zip(
+                histogram.buckets, histogram.bucket_counts, strict=True
+            ):
+                lines.append(
+                    _sample(
+                        "stage_duration_seconds_bucket",
+                        count,
+                        stage=stage,
+                        le=_format_value(bound),
+                    )
+                )
+            lines.append(
+                _sample(
+                    "stage_duration_seconds_bucket",
+                    histogram.count,
+                    stage=stage,
+                    le="+Inf",
+                )
+            )
+            lines.append(
+                _sample("stage_duration_seconds_sum", histogram.sum, stage=stage)
+            )
+            lines.append(
+                _sample("stage_duration_seconds_count", histogram.count, stage=stage)
+            )
+
+        self._header(lines, "renders_total", "counter", "Finished renders by outcome")
+        for outcome, count in sorted(self.renders.items()):
+            lines.append(_sample("renders_total", count, outcome=outcome))
+        self._header(lines, "render_failures_total", "counter", "Failed renders")
+        lines.append(_sample("render_failures_total", self.failures))
+        self._header(lines, "pages_total", "counter", "Rendered pages")
+        lines.append(_sample("pages_total", self.pages))
+        self._header(lines, "output_bytes_total", "counter", "Size of written PDFs")
+        lines.append(_sample("output_bytes_total", self.output_bytes))
+        self._header(
+            lines, "image_bytes_total", "counter", "Size of images embedded in PDFs"
+        )
+        lines.append(_sample("image_bytes_total", self.image_bytes))
+
+        self._header(
+            lines,
+            "cache_requests_total",
+            "counter",
+            "Cache lookups by cache and result",
+        )
+        for (cache, hit), count in sorted(self.cache_requests.items()):
+            lines.append(
+                _sample(
+                    "cache_requests_total",
+                    count,
+                    cache=cache,
+                    result="hit" if hit else "miss",
+                )
+            )
+
+        for name, timestamp, help_text in [
+            ("last_run_timestamp_seconds", self.last_run, "End of the last render"),
+            (
+                "last_success_timestamp_seconds",
+                self.last_success,
+                "End of the last successful render",
+            ),
+        ]:
+            if timestamp is not None:
+                self._header(lines, name, "gauge", help_text)
+                lines.append(_sample(name, timestamp))
+        return "\n".join(lines) + "\n"
+
+    def _read_sample(self, line: str) -> None:
+        match = _SAMPLE.fullmatch(line)
+        if match is None:
+            raise ValueError(f"not a sample: {line!r}")
+        name, value = match["name"], float(match["value"])
+        labels = {
+            label["key"]: _unescape_label_value(label["value"])
+            for label in _LABEL.finditer(match["labels"] or "")
+        }
+
+        if name.startswith("stage_duration_seconds_"):
+            self._read_histogram_sample(name, value, labels)
+        elif name == "renders_total":
+            self.renders[labels["outcome"]] = int(value)
+        elif name == "cache_requests_total":
+            hit = labels["result"] == "hit"
+            self.cache_requests[labels["cache"], hit] = int(value)
+        elif name in _COUNTER_ATTRIBUTES:
+            setattr(self, _COUNTER_ATTRIBUTES[name], int(value))
+        elif name == "last_run_timestamp_seconds":
+            self.last_run = value
+        elif name == "last_success_timestamp_seconds":
+            self.last_success = value
+
+    def _read_histogram_sample(
+        self, name: str, value: float, labels: dict[str, str]
+    ) -> None:
+        histogram = self.stage_durations.setdefault(
+            labels["stage"], Histogram(self.buckets)
+        )
+        if name == "stage_duration_seconds_sum":
+            histogram.sum = value
+        elif name == "stage_duration_seconds_count":
+            histogram.count = int(value)
+        elif labels["le"] != "+Inf":
+            # raises ValueError for buckets that changed since
+            index = histogram.buckets.index(float(labels["le"]))
+            histogram.bucket_counts[index] = int(value)
+
+    def _observe_spans(self, tracer: Tracer) -> None:
+        draft = any(
+            span.name == "render_pdf" and span.attributes.get("draft")
+            for span in tracer.spans
+        )
+        for span in tracer.spans:
+            if span.end_time_unix_nano is None:
+                continue
+            histogram = self.stage_durations.setdefault(
+                span.name, Histogram(self.buckets)
+            )
+            histogram.observe(span.duration)
+
+            if span.name == "render_pdf":
+                self.pages += int(span.attributes.get("pages", 0))
+            if "cache_hit" in span.attributes:
+                cache = str(span.attributes.get("cache", span.name))
+                self.cache_requests[cache, bool(span.attributes["cache_hit"])] += 1
+            # drafts embed placeholders instead of the fetched images
+            if (
+                span.name == "fetch"
+                and not draft
+                and str(span.attributes.get("mime_type", "")).startswith("image/")
+            ):
+                self.image_bytes += int(span.attributes.get("bytes", 0))
+
+    @staticmethod
+    def _header(lines: list[str], name: str, metric_type: str, help_text: str) -> None:
+        lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}_{name} {metric_type}")
+
+
+def _sample(name: str, value: float, **labels: str) -> str:
+    label_text = ",".join(
+        f'{key}="{_escape_label_value(label)}"' for key, label in labels.items()
+    )
+    if label_text:
+        label_text = f"{{{label_text}}}"
+    return f"{PREFIX}_{name}{label_text} {_format_value(value)}"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _unescape_label_value(value: str) -> str:
+    return re.sub(r"\\(.)", lambda match: "\n" if match[1] == "n" else match[1], value)
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
@@ -0,0 +1,140 @@
+import contextlib
+import datetime
+import fcntl
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from . import PACKAGE_DIR
+from .models import Profile
+from .view_models import profile_digest
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+LOCK_FILENAME = ".manifest.lock"
+
+
+class Artifact(BaseModel):
+    """A rendered file in the output directory"""
+
+    sha256: str
+    size: int
+    input_digest: str
+    render_duration: float  # seconds
+    rendered_at: datetime.datetime
+    stale: bool = False  # a previous render's output, as the render timed out
+    last_updated: datetime.date | None = None  # "Last updated" date printed in the file
+
+
+class Manifest(BaseModel):
+    """All artifacts of an output directory, keyed by their file name"""
+
+    artifacts: dict[str, Artifact] = {}
+
+
+def write_artifact(
+    path: Path,
+    data: bytes,
+    input_digest: str,
+    render_duration: float,
+    stale: bool = False,
+    last_updated: datetime.date | None = None,
+) -> Artifact:
+    """Atomically write a rendered file and record it in the directory's manifest
+
+    Unchanged content isn't rewritten, so the file's modification time stays stable
+    for downstream syncs.
+    """
+    artifact = Artifact(
+        sha256=hashlib.sha256(data).hexdigest(),
+        size=len(data),
+        input_digest=input_digest,
+        render_duration=render_duration,
+        rendered_at=datetime.datetime.now(tz=datetime.UTC),
+        stale=stale,
+        last_updated=last_updated,
+    )
+    with _locked_manifest(path.parent) as manifest:
+        previous = manifest.artifacts.get(path.name)
+        if previous and previous.sha256 == artifact.sha256 and path.exists():
+            logger.info("%s is unchanged", path)
+        else:
+            atomic_write_bytes(path, data)
+            logger.info("Wrote %s (%d bytes)", path, artifact.size)
+        manifest.artifacts[path.name] = artifact
+    return artifact
+
+
+def read_manifest(directory: Path) -> Manifest:
+    """Read the manifest of an output directory, empty if there's none yet"""
+    path = directory / MANIFEST_FILENAME
+    if not path.exists():
+        return Manifest()
+    return Manifest.model_validate_json(path.read_bytes())
+
+
+@contextlib.contextmanager
+def _locked_manifest(directory: Path) -> Iterator[Manifest]:
+    """Read the manifest exclusively and write it back atomically after the block"""
+    directory.mkdir(parents=True, exist_ok=True)
+    with (directory / LOCK_FILENAME).open("a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            manifest = read_manifest(directory)
+            yield manifest
+            atomic_write_bytes(
+                directory / MANIFEST_FILENAME,
+                manifest.model_dump_json(indent=2).encode(),
+            )
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write `data` to `path` so that readers see either the old or the new file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # the temporary file has to be on the same file system for the rename to be atomic
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+    ) as tmp_file:
+        tmp_file.write(data)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    try:
+        # temporary files are only readable by their owner, but e.g. web servers
+        # need to read the output
+        Path(tmp_file.name).chmod(0o644)
+        Path(tmp_file.name).replace(path)
+    except BaseException:
+        Path(tmp_file.name).unlink(missing_ok=True)
+        raise
+
+
+def input_digest(profile: Profile, **options: object) -> str:
+    """Hash of everything that determines a render's output, except for today's date
+
+    This covers the profile, the render options, e.g. the renderer's version, and all
+    package files (code, templates, styles, fonts and media).
+    """
+    digest = hashlib.sha256()
+    digest.update(profile_digest(profile).encode())
+    digest.update(repr(sorted(options.items())).encode())
+    digest.update(_package_digest().encode())
+    return digest.hexdigest()
+
+
+@functools.cache
+def _package_digest() -> str:
+    digest = hashlib.sha256()
+    for path in sorted(PACKAGE_DIR.rglob("*")):
+        if path.is_file() and "__pycache__" not in path.parts:
+            digest.update(str(path.relative_to(PACKAGE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
@@ -0,0 +1,156 @@
+import argparse
+import gzip
+import hashlib
+import logging
+import mimetypes
+from pathlib import Path
+
+import brotli
+from pydantic import BaseModel
+
+from . import OUTPUT_DIR
+from .output import LOCK_FILENAME, atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+STATIC_MANIFEST_FILENAME = "static-manifest.json"
+COMPRESSIBLE_SUFFIXES = {
+    ".css",
+    ".html",
+    ".js",
+    ".json",
+    ".pdf",
+    ".svg",
+    ".txt",
+    ".xml",
+}
+# file name suffix of each precompressed variant, by content coding
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+class Representation(BaseModel):
+    """One encoding of a served file"""
+
+    etag: str
+    content_length: int
+
+
+class StaticAsset(BaseModel):
+    """A served file with its validators and precompressed variants"""
+
+    sha256: str
+    content_type: str
+    identity: Representation
+    encodings: dict[str, Representation] = {}
+
+
+class StaticManifest(BaseModel):
+    """All served files of a directory, keyed by their path relative to it"""
+
+    assets: dict[str, StaticAsset] = {}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Precompress the output directory and record cache validators"
+    )
+    parser.add_argument("directory", type=Path, nargs="?", default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    publish(args.directory)
+
+
+def publish(directory: Path) -> StaticManifest:
+    """Write `.br` and `.gz` siblings of all compressible files and their manifest
+
+    Files whose content hash didn't change since the last run aren't recompressed.
+    """
+    previous = read_static_manifest(directory)
+    manifest = StaticManifest()
+    for path in sorted(directory.rglob("*")):
+        if not _is_published(path, directory):
+            continue
+        name = path.relative_to(directory).as_posix()
+        data = path.read_bytes()
+        sha256 = hashlib.sha256(data).hexdigest()
+
+        asset = previous.assets.get(name)
+        if asset is None or asset.sha256 != sha256 or not _variants_exist(path, asset):
+            asset = _publish_asset(path, data, sha256)
+        else:
+            logger.debug("%s is unchanged", name)
+        manifest.assets[name] = asset
+
+    atomic_write_bytes(
+        directory / STATIC_MANIFEST_FILENAME,
+        manifest.model_dump_json(indent=2).encode(),
+    )
+    return manifest
+
+
+def read_static_manifest(directory: Path) -> StaticManifest:
+    """Read the static manifest of a directory, empty if there's none yet"""
+    path = directory / STATIC_MANIFEST_FILENAME
+    if not path.exists():
+        return StaticManifest()
+    return StaticManifest.model_validate_json(path.read_bytes())
+
+
+def _publish_asset(path: Path, data: bytes, sha256: str) -> StaticAsset:
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    asset = StaticAsset(
+        sha256=sha256,
+        content_type=content_type,
+        identity=Representation(etag=f'"{sha256[:32]}"', content_length=len(data)),
+    )
+    if path.suffix not in COMPRESSIBLE_SUFFIXES:
+        return asset
+
+    for encoding, suffix in ENCODINGS.items():
+        variant_path = path.with_name(path.name + suffix)
+        compressed = _compress(data, encoding)
+        # serving a variant that isn't smaller than the original would be a waste
+        if len(compressed) >= len(data):
+            variant_path.unlink(missing_ok=True)
+            continue
+        atomic_write_bytes(variant_path, compressed)
+        asset.encodings[encoding] = Representation(
+            # strong validators have to differ between encodings of the same content
+            etag=f'"{sha256[:32]}-{encoding}"',
+            content_length=len(compressed),
+        )
+    logger.info(
+        "Published %s (%s)",
+        path.name,
+        ", ".join(
+            f"{encoding}: {len(data)} -> {representation.content_length} bytes"
+            for encoding, representation in asset.encodings.items()
+        )
+        or "not compressible",
+    )
+    return asset
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    # mtime=0 keeps the output reproducible for equal input
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _is_published(path: Path, directory: Path) -> bool:
+    relative = path.relative_to(directory)
+    return (
+        path.is_file()
+        and not any(part.startswith(".") for part in relative.parts)
+        and path.suffix not in ENCODINGS.values()
+        and path.name not in {STATIC_MANIFEST_FILENAME, LOCK_FILENAME}
+    )
+
+
+def _variants_exist(path: Path, asset: StaticAsset) -> bool:
+    return all(
+        path.with_name(path.name + ENCODINGS[encoding]).exists()
+        for encoding in asset.encodings
+    )
@@ -0,0 +1,291 @@
+import abc
+import contextlib
+import logging
+import sqlite3
+import time
+from collections.abc import Callable, Iterator
+from enum import StrEnum
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from . import CACHE_DIR
+from .models import Profile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = CACHE_DIR / "render_queue.sqlite3"
+
+
+class JobStatus(StrEnum):
+    """Lifecycle of a render job"""
+
+    QUEUED = "queued"
+    LEASED = "leased"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class Job(BaseModel):
+    """A leased render job"""
+
+    id: int
+    profile: Profile
+    attempts: int
+
+
+class JobResult(BaseModel):
+    """Outcome of a render job"""
+
+    id: int
+    status: JobStatus
+    attempts: int
+    pdf: bytes | None = None
+    render_duration: float | None = None  # seconds
+    error: str | None = None
+
+
+class QueueStats(BaseModel):
+    """Snapshot of a queue's state and recent throughput"""
+
+    jobs: dict[JobStatus, int]
+    completed_in_window: int
+    window: float  # seconds
+    mean_render_duration: float | None  # seconds, over the window
+
+    @property
+    def throughput(self) -> float:
+        """Completed jobs per second over the window, 0 for an empty window"""
+        if self.window <= 0:
+            return 0.0
+        return self.completed_in_window / self.window
+
+
+class RenderQueue(abc.ABC):
+    """Durable queue of profiles to render, shared by producers and workers
+
+    Workers lease jobs for a limited time. Jobs whose lease expires, e.g. because the
+    worker died, can be leased again. Failed jobs are retried with exponential backoff
+    until they run out of attempts.
+    """
+
+    @abc.abstractmethod
+    def enqueue(self, profile: Profile, max_attempts: int = 3) -> int:
+        """Add a profile to render and return the job's ID"""
+
+    @abc.abstractmethod
+    def lease(self, worker_id: str, lease_duration: float) -> Job | None:
+        """Lease the next due job, if there's any"""
+
+    @abc.abstractmethod
+    def complete(
+        self, job_id: int, worker_id: str, pdf: bytes, render_duration: float
+    ) -> bool:
+        """Store a job's result, returns False if the worker lost the lease meanwhile"""
+
+    @abc.abstractmethod
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """Retry a job later or give up on it, returns False if the lease was lost"""
+
+    @abc.abstractmethod
+    def result(self, job_id: int) -> JobResult:
+        """Current state of a job, including its PDF once it's done"""
+
+    @abc.abstractmethod
+    def stats(self, window: float = 300.0) -> QueueStats:
+        """Job counts and throughput over the last `window` seconds"""
+
+
+class SQLiteRenderQueue(RenderQueue):
+    """Render queue in a SQLite database in WAL mode
+
+    Works fully offline. Any number of producer and worker processes on the same
+    host can share the database file. Since WAL mode relies on shared memory, the file
+    must not live on a network file system; nodes on other hosts need a networked
+    implementation of `RenderQueue`.
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_QUEUE_PATH,
+        backoff_base: float = 5.0,
+        backoff_max: float = 300.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # transactions are managed explicitly, see `_transaction`
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                leased_by TEXT,
+                lease_expires_at REAL,
+                enqueued_at REAL NOT NULL,
+                finished_at REAL,
+                pdf BLOB,
+                render_duration REAL,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, available_at);
+            CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+            """
+        )
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def enqueue(self, profile: Profile, max_attempts: int = 3) -> int:
+        now = self.clock()
+        with self._transaction() as cursor:
+            (job_id,) = cursor.execute(
+                "INSERT INTO jobs (payload, status, max_attempts, available_at, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?) RETURNING id",
+                (profile.model_dump_json(), JobStatus.QUEUED, max_attempts, now, now),
+            ).fetchone()
+        logger.info("Enqueued job %d", job_id)
+        return job_id
+
+    def lease(self, worker_id: str, lease_duration: float) -> Job | None:
+        now = self.clock()
+        with self._transaction() as cursor:
+            # give up on jobs whose last attempt's lease expired
+            cursor.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = 'lease expired' "
+                "WHERE status = ? AND lease_expires_at <= ? AND attempts >= max_attempts",
+                (JobStatus.FAILED, now, JobStatus.LEASED, now),
+            )
+            row = cursor.execute(
+                "SELECT id, payload, attempts FROM jobs "
+                "WHERE (status = ? AND available_at <= ?) "
+                "OR (status = ? AND lease_expires_at <= ?) "
+                "ORDER BY available_at, id LIMIT 1",
+                (JobStatus.QUEUED, now, JobStatus.LEASED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, payload, attempts = row
+            cursor.execute(
+                "UPDATE jobs SET status = ?, leased_by = ?, lease_expires_at = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (JobStatus.LEASED, worker_id, now + lease_duration, job_id),
+            )
+        return Job(
+            id=job_id,
+            profile=Profile.model_validate_json(payload),
+            attempts=attempts + 1,
+        )
+
+    def complete(
+        self, job_id: int, worker_id: str, pdf: bytes, render_duration: float
+    ) -> bool:
+        with self._transaction() as cursor:
+            cursor.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, pdf = ?, "
+                "render_duration = ?, error = NULL "
+                "WHERE id = ? AND status = ? AND leased_by = ?",
+                (
+                    JobStatus.DONE,
+                    self.clock(),
+                    pdf,
+                    render_duration,
+                    job_id,
+                    JobStatus.LEASED,
+                    worker_id,
+                ),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        now = self.clock()
+        with self._transaction() as cursor:
+            row = cursor.execute(
+                "SELECT attempts, max_attempts FROM jobs "
+                "WHERE id = ? AND status = ? AND leased_by = ?",
+                (job_id, JobStatus.LEASED, worker_id),
+            ).fetchone()
+            if row is None:
+                return False
+            attempts, max_attempts = row
+            if attempts >= max_attempts:
+                logger.error("Job %d failed for good: %s", job_id, error)
+                cursor.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                    (JobStatus.FAILED, now, error, job_id),
+                )
+            else:
+                backoff = self.backoff(attempts)
+                logger.warning(
+                    "Job %d failed, retrying in %.0fs: %s", job_id, backoff, error
+                )
+                cursor.execute(
+                    "UPDATE jobs SET status = ?, available_at = ?, error = ? WHERE id = ?",
+                    (JobStatus.QUEUED, now + backoff, error, job_id),
+                )
+            return True
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds to wait before retrying a job that failed `attempts` times"""
+        return min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+
+    def result(self, job_id: int) -> JobResult:
+        row = self._connection.execute(
+            "SELECT status, attempts, pdf, render_duration, error FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"unknown job {job_id}")
+        status, attempts, pdf, render_duration, error = row
+        return JobResult(
+            id=job_id,
+            status=status,
+            attempts=attempts,
+            pdf=pdf,
+            render_duration=render_duration,
+            error=error,
+        )
+
+    def stats(self, window: float = 300.0) -> QueueStats:
+        jobs = dict.fromkeys(JobStatus, 0)
+        for status, count in self._connection.execute(
+            "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+        ):
+            jobs[JobStatus(status)] = count
+        completed, mean_render_duration = self._connection.execute(
+            "SELECT COUNT(*), AVG(render_duration) FROM jobs "
+            "WHERE status = ? AND finished_at > ?",
+            (JobStatus.DONE, self.clock() - window),
+        ).fetchone()
+        return QueueStats(
+            jobs=jobs,
+            completed_in_window=completed,
+            window=window,
+            mean_render_duration=mean_render_duration,
+        )
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Run the block in a write transaction, serialised with other processes"""
+        cursor = self._connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            yield cursor
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+        else:
+            cursor.execute("COMMIT")
+        finally:
+            cursor.close()
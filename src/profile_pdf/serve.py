@@ -0,0 +1,180 @@
+import argparse
+import functools
+import hashlib
+import logging
+import re
+import time
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from . import OUTPUT_DIR
+from .publish import ENCODINGS, StaticAsset, read_static_manifest
+
+logger = logging.getLogger(__name__)
+
+# quality value of an Accept-Encoding item, RFC 9110, 12.4.2
+_QVALUE = re.compile(r"0(?:\.\d{0,3})?|1(?:\.0{0,3})?")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve a published directory with precompressed variants"
+    )
+    parser.add_argument("directory", type=Path, nargs="?", default=OUTPUT_DIR)
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--throttle",
+        type=int,
+        default=None,
+        help="limit response bodies to this many bytes per second, to simulate slow networks",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = make_server(args.directory, args.bind, args.port, throttle=args.throttle)
+    logger.info("Serving %s on http://%s:%d", args.directory, args.bind, args.port)
+    server.serve_forever()
+
+
+def make_server(
+    directory: Path,
+    bind: str = "127.0.0.1",
+    port: int = 0,
+    throttle: int | None = None,
+) -> ThreadingHTTPServer:
+    """Create a server for `directory`, port 0 picks a free port
+
+    `throttle` limits each response body to that many bytes per second.
+    """
+    handler = functools.partial(
+        StaticAssetHandler, directory=str(directory), throttle=throttle
+    )
+    return ThreadingHTTPServer((bind, port), handler)
+
+
+class StaticAssetHandler(SimpleHTTPRequestHandler):
+    """Serves files of the static manifest with content negotiation and validators
+
+    Precompressed variants are served to clients that accept their encoding. Every
+    response carries the strong ETag of its representation, and conditional requests
+    are answered with 304 Not Modified. Files that aren't in the manifest, or changed
+    since it was written, are served as usual.
+    """
+
+    # size of the chunks in which throttled responses are sent
+    throttle_chunk_size = 1024
+
+    def __init__(self, *args: Any, throttle: int | None = None, **kwargs: Any) -> None:
+        # set before calling the base class, which already handles the request
+        self.throttle = throttle
+        super().__init__(*args, **kwargs)
+
+    def send_head(self) -> BinaryIO | None:
+        path = Path(self.translate_path(self.path))
+        if path.is_dir():
+            path /= "index.html"
+        directory = Path(self.directory)
+        try:
+            name = path.relative_to(directory).as_posix()
+        except ValueError:
+            return super().send_head()
+        asset = read_static_manifest(directory).assets.get(name)
+        if asset is None or not _is_published_version(path, asset):
+            # e.g. rewritten by a render without publishing it again
+            return super().send_head()
+
+        encoding = self._negotiate_encoding(asset)
+        representation = asset.encodings[encoding] if encoding else asset.identity
+        if representation.etag in self._if_none_match():
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._send_asset_headers(representation.etag, encoding)
+            self.end_headers()
+            return None
+
+        file_path = (
+            path.with_name(path.name + ENCODINGS[encoding]) if encoding else path
+        )
+        file = file_path.open("rb")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("Content-Length", str(representation.content_length))
+        self._send_asset_headers(representation.etag, encoding)
+        self.end_headers()
+        return file
+
+    def copyfile(self, source, outputfile) -> None:
+        if self.throttle is None:
+            super().copyfile(source, outputfile)
+            return
+        while chunk := source.read(self.throttle_chunk_size):
+            outputfile.write(chunk)
+            outputfile.flush()
+            time.sleep(len(chunk) / self.throttle)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    def _negotiate_encoding(self, asset: StaticAsset) -> str | None:
+        """Best encoding of `asset` the client accepts, None for the identity"""
+        accepted = _accepted_encodings(self.headers.get("Accept-Encoding", ""))
+        best, best_quality = None, 0.0
+        # ENCODINGS is ordered by preference, which decides between equal qualities
+        for encoding in ENCODINGS:
+            quality = accepted.get(encoding, accepted.get("*", 0.0))
+            if encoding in asset.encodings and quality > best_quality:
+                best, best_quality = encoding, quality
+        # the identity is only preferred if the client says so explicitly
+        if accepted.get("identity", 0.0) > best_quality:
+            return None
+        return best
+
+    def _if_none_match(self) -> set[str]:
+        header = self.headers.get("If-None-Match", "")
+        return {etag.strip() for etag in header.split(",") if etag.strip()}
+
+    def _send_asset_headers(self, etag: str, encoding: str | None) -> None:
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        # caches may keep responses, but have to revalidate them, which is cheap
+        self.send_header("Cache-Control", "no-cache")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+
+
+def _accepted_encodings(header: str) -> dict[str, float]:
+    """Quality values of the content codings in an Accept-Encoding header
+
+    Codings with a quality of 0 are refused, items with an invalid one are ignored.
+    """
+    accepted = {}
+    for item in header.split(","):
+        coding, *parameters = (part.replace(" ", "") for part in item.split(";"))
+        qualities = [param for param in parameters if param.lower().startswith("q=")]
+        if not coding:
+            continue
+        if not qualities:
+            accepted[coding.lower()] = 1.0
+        elif match := _QVALUE.fullmatch(qualities[0][2:]):
+            accepted[coding.lower()] = float(match[0])
+    return accepted
+
+
+def _is_published_version(path: Path, asset: StaticAsset) -> bool:
+    """Whether the file at `path` still has the content recorded in the manifest"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return False
+    if stat.st_size != asset.identity.content_length:
+        return False
+    return _file_sha256(path, stat.st_size, stat.st_mtime_ns) == asset.sha256
+
+
+@functools.lru_cache(maxsize=256)
+def _file_sha256(path: Path, size: int, mtime_ns: int) -> str:
+    """Hash of a file, cached until its size or modification time changes"""
+    with path.open("rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
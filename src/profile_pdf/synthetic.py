@@ -0,0 +1,21 @@
+from .models import Profile
+
+# history sizes used by the layout scaling benchmark
+BENCHMARK_SIZES = (10, 100, 1_000)
+
+
+def synthetic_profile(n_experiences: int) -> Profile:
+    """Build a profile with `n_experiences` work experiences
+
+    The experiences cycle through the ones of the default profile, so their text
+    lengths, technologies and logos are realistic. The result is deterministic.
+    """
+    profile = Profile()
+    templates = profile.work_experience
+    work_experience = [
+        templates[i % len(templates)].model_copy(
+            update={"title": f"{templates[i % len(templates)].title} #{i + 1}"}
+        )
+        for i in range(n_experiences)
+    ]
+    return profile.model_copy(update={"work_experience": work_experience})
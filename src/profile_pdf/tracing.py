@@ -0,0 +1,238 @@
+import contextlib
+import functools
+import json
+import logging
+import secrets
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import weasyprint.document
+from pydantic import BaseModel, Field
+from weasyprint import Document, default_url_fetcher
+from weasyprint.formatting_structure.boxes import ReplacedBox
+from weasyprint.logger import PROGRESS_LOGGER
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "profile-pdf"
+
+AttributeValue = str | int | float | bool
+
+
+class Span(BaseModel):
+    """A timed operation, modelled after OpenTelemetry spans"""
+
+    name: str
+    span_id: str = Field(default_factory=lambda: secrets.token_hex(8))
+    parent_span_id: str | None = None
+    start_time_unix_nano: int
+    end_time_unix_nano: int | None = None
+    attributes: dict[str, AttributeValue] = {}
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds"""
+        if self.end_time_unix_nano is None:
+            return 0.0
+        return (self.end_time_unix_nano - self.start_time_unix_nano) / 1e9
+
+
+class Tracer:
+    """Collects the spans of a single render, exportable as OTLP/JSON"""
+
+    def __init__(self) -> None:
+        self.trace_id = secrets.token_hex(16)
+        self.spans: list[Span] = []
+        self._stack: list[Span] = []
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: AttributeValue) -> Iterator[Span]:
+        """Record a span around the wrapped block, nested under the current span"""
+        span = self.start_span(name, attributes)
+        self._stack.append(span)
+        try:
+            yield span
+        finally:
+            self._stack.pop()
+            span.end_time_unix_nano = time.time_ns()
+
+    def start_span(
+        self,
+        name: str,
+        attributes: dict[str, AttributeValue] | None = None,
+        start_time_unix_nano: int | None = None,
+    ) -> Span:
+        """Start a span that has to be ended by setting its `end_time_unix_nano`"""
+        span = Span(
+            name=name,
+            parent_span_id=self._stack[-1].span_id if self._stack else None,
+            start_time_unix_nano=start_time_unix_nano or time.time_ns(),
+            attributes=attributes or {},
+        )
+        self.spans.append(span)
+        return span
+
+    def export(self, path: Path) -> None:
+        """Write all spans to `path` in the OTLP/JSON trace format"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_otlp(), indent=2))
+        logger.info("Exported %d spans to %s", len(self.spans), path)
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Convert the spans into an OTLP/JSON `ExportTraceServiceRequest`"""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes({"service.name": SERVICE_NAME})
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [self._otlp_span(span) for span in self.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def _otlp_span(self, span: Span) -> dict[str, Any]:
+        end_time_unix_nano = span.end_time_unix_nano or span.start_time_unix_nano
+        otlp_span = {
+            "traceId": self.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_time_unix_nano),
+            "endTimeUnixNano": str(end_time_unix_nano),
+            "attributes": _otlp_attributes(span.attributes),
+        }
+        if span.parent_span_id:
+            otlp_span["parentSpanId"] = span.parent_span_id
+        return otlp_span
+
+
+def _otlp_attributes(attributes: dict[str, AttributeValue]) -> list[dict[str, Any]]:
+    result = []
+    for key, value in attributes.items():
+        # bool has to be checked before int, as it's a subclass of it
+        if isinstance(value, bool):
+            otlp_value: dict[str, Any] = {"boolValue": value}
+        elif isinstance(value, int):
+            otlp_value = {"intValue": str(value)}
+        elif isinstance(value, float):
+            otlp_value = {"doubleValue": value}
+        else:
+            otlp_value = {"stringValue": str(value)}
+        result.append({"key": key, "value": otlp_value})
+    return result
+
+
+def traced_url_fetcher(tracer: Tracer) -> Callable[..., dict]:
+    """Wrap WeasyPrint's default URL fetcher to record a span per fetched resource"""
+
+    def url_fetcher(url: str, *args, **kwargs) -> dict:
+        with tracer.span("fetch", url=url) as span:
+            result = default_url_fetcher(url, *args, **kwargs)
+            # read file objects here so that reading them is part of the span
+            if "file_obj" in result:
+                with result.pop("file_obj") as file_obj:
+                    result["string"] = file_obj.read()
+            span.attributes["mime_type"] = result.get("mime_type") or ""
+            span.attributes["bytes"] = len(result["string"])
+        return result
+
+    return url_fetcher
+
+
+@contextlib.contextmanager
+def patch_weasyprint(owner: object, name: str, replacement: Any) -> Iterator[None]:
+    """Replace the attribute `name` of `owner`, a part of WeasyPrint, within the block
+
+    This is for what WeasyPrint has no hooks for. Patches are process-wide, so nothing
+    should render concurrently in other threads while they're active.
+    """
+    original = getattr(owner, name)
+    setattr(owner, name, replacement)
+    try:
+        yield
+    finally:
+        setattr(owner, name, original)
+
+
+@contextlib.contextmanager
+def trace_image_loading(tracer: Tracer) -> Iterator[None]:
+    """Record a span per image that's fetched and opened during layout
+
+    Opening an image only reads its header, raster images are decoded while writing
+    the PDF, which is part of the `write_pdf` span.
+    """
+    original = weasyprint.document.original_get_image_from_uri
+
+    @functools.wraps(original)
+    def get_image_from_uri(*args, **kwargs):
+        with tracer.span("open_image", url=kwargs.get("url", "")):
+            return original(*args, **kwargs)
+
+    with patch_weasyprint(
+        weasyprint.document, "original_get_image_from_uri", get_image_from_uri
+    ):
+        yield
+
+
+class _PageLayoutHandler(logging.Handler):
+    """Turns WeasyPrint's layout progress messages into one span per laid out page"""
+
+    def __init__(self, tracer: Tracer) -> None:
+        super().__init__()
+        self.tracer = tracer
+        self.current: Span | None = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        now = time.time_ns()
+        self.end_current(now)
+        # "Step 5 - Creating layout - Page %d" marks the start of a page's layout.
+        # Pages that are "(up-to-date)" are reused by WeasyPrint and cost nothing.
+        if record.msg == "Step 5 - Creating layout - Page %d":
+            page = int(record.getMessage().rsplit(" ", 1)[-1])
+            self.current = self.tracer.start_span(
+                "layout_page", {"page": page}, start_time_unix_nano=now
+            )
+
+    def end_current(self, end_time_unix_nano: int) -> None:
+        if self.current is not None:
+            self.current.end_time_unix_nano = end_time_unix_nano
+            self.current = None
+
+
+@contextlib.contextmanager
+def trace_page_layout(tracer: Tracer) -> Iterator[None]:
+    """Record a span per page layout pass within the block"""
+    handler = _PageLayoutHandler(tracer)
+    level, propagate = PROGRESS_LOGGER.level, PROGRESS_LOGGER.propagate
+    if PROGRESS_LOGGER.getEffectiveLevel() > logging.INFO:
+        # progress messages are only enabled for our handler, don't leak them
+        PROGRESS_LOGGER.setLevel(logging.INFO)
+        PROGRESS_LOGGER.propagate = False
+    PROGRESS_LOGGER.addHandler(handler)
+    try:
+        yield
+    finally:
+        handler.end_current(time.time_ns())
+        PROGRESS_LOGGER.removeHandler(handler)
+        PROGRESS_LOGGER.setLevel(level)
+        PROGRESS_LOGGER.propagate = propagate
+
+
+def document_stats(document: Document) -> dict[str, AttributeValue]:
+    """Count pages, boxes and distinct images of a laid out document"""
+    boxes = 0
+    images = set()
+    for page in document.pages:
+        for box in page._page_box.descendants():  # noqa: SLF001
+            boxes += 1
+            if isinstance(box, ReplacedBox):
+                images.add(id(box.replacement))
+    return {"pages": len(document.pages), "boxes": boxes, "images": len(images)}
@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import pathlib
+
+from pydantic import BaseModel
+
+from .models import Education, Profile, WorkExperience
+
+logger = logging.getLogger(__name__)
+
+# number of render contexts kept in memory, e.g. for profile variants in a batch
+MAX_CACHED_CONTEXTS = 32
+
+
+class CoreSkillView(BaseModel):
+    """Core skill group with formatted technologies"""
+
+    subject: str
+    technologies: list[str]
+
+
+class WorkExperienceView(BaseModel):
+    """Work experience ready to be rendered"""
+
+    title: str
+    logo_url: str
+    meta: str
+    description: str
+    bullet_points: list[str]
+    technologies: list[tuple[str, str]]
+
+
+class EducationView(BaseModel):
+    """Education ready to be rendered"""
+
+    degree: str
+    logo_url: str
+    meta: str
+    specialisation: str
+    thesis: str
+
+
+class RenderContext(BaseModel):
+    """Everything the templates need, precomputed once per profile"""
+
+    profile: Profile
+    profile_image_url: str
+    icon_urls: list[str]
+    core_skills: list[CoreSkillView]
+    work_experience: list[WorkExperienceView]
+    education: list[EducationView]
+
+
+_render_contexts: dict[str, RenderContext] = {}
+
+
+def get_render_context(profile: Profile) -> RenderContext:
+    """Return the render context of the profile, building it only on first use"""
+    key = profile_digest(profile)
+    context = _render_contexts.get(key)
+    if context is None:
+        logger.debug("Building render context for profile %s", key)
+        context = build_render_context(profile)
+        if len(_render_contexts) >= MAX_CACHED_CONTEXTS:
+            # dicts keep insertion order, so this evicts the oldest context
+            del _render_contexts[next(iter(_render_contexts))]
+        _render_contexts[key] = context
+    return context
+
+
+def render_context_cached(profile: Profile) -> bool:
+    """Whether the render context of the profile is built already"""
+    return profile_digest(profile) in _render_contexts
+
+
+def profile_digest(profile: Profile) -> str:
+    """Content hash of the profile, equal for equal profiles"""
+    return hashlib.sha256(profile.model_dump_json().encode()).hexdigest()
+
+
+def build_render_context(profile: Profile) -> RenderContext:
+    """Precompute all derived values that the templates need"""
+    return RenderContext(
+        profile=profile,
+        profile_image_url=_asset_url(profile.profile_image_path),
+        icon_urls=[_asset_url(path) for path in profile.icon_paths],
+        core_skills=[
+            CoreSkillView(
+                subject=core_skill.subject,
+                technologies=[
+                    f"{technology.name}: {technology.years} {'year' if technology.years == 1 else 'years'}"
+                    for technology in core_skill.technologies
+                ],
+            )
+            for core_skill in profile.core_skills
+        ],
+        work_experience=[_work_experience_view(we) for we in profile.work_experience],
+        education=[_education_view(ed) for ed in profile.education],
+    )
+
+
+def _work_experience_view(we: WorkExperience) -> WorkExperienceView:
+    title = we.title
+    if we.contract_type:
+        title += f" ({we.contract_type})"
+    return WorkExperienceView(
+        title=title,
+        logo_url=_asset_url(we.logo),
+        meta=f"{we.company} | {_format_duration(we)} | {we.location}",
+        description=we.description,
+        bullet_points=we.bullet_points,
+        technologies=[
+            (tech_category, ", ".join(sorted(tech_list)))
+            for tech_category, tech_list in we.technologies.items()
+        ],
+    )
+
+
+def _education_view(ed: Education) -> EducationView:
+    return EducationView(
+        degree=ed.degree,
+        logo_url=_asset_url(ed.logo),
+        meta=f"{ed.field_of_study} | {ed.institution} | {_format_duration(ed)}",
+        specialisation=ed.specialisation,
+        thesis=ed.thesis,
+    )
+
+
+def _format_duration(obj: WorkExperience | Education) -> str:
+    """Format duration string from an object with start and end attributes"""
+    if obj.end:
+        return f"{obj.start} - {obj.end}"
+    return f"Since {obj.start}"
+
+
+def _asset_url(path: pathlib.Path) -> str:
+    """Resolve an asset path to an absolute file URL"""
+    return path.resolve().as_uri()
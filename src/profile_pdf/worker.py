@@ -0,0 +1,127 @@
+import argparse
+import io
+import logging
+import os
+import socket
+import time
+from pathlib import Path
+
+from .generate import _load_profile, _render_html_template, _render_pdf
+from .metrics import RenderMetrics
+from .models import Profile
+from .render_queue import DEFAULT_QUEUE_PATH, RenderQueue, SQLiteRenderQueue
+from .tracing import Tracer
+from .view_models import render_context_cached
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Queue and render profiles")
+    parser.add_argument(
+        "--queue", type=Path, default=DEFAULT_QUEUE_PATH, help="SQLite queue file"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="enqueue profiles")
+    enqueue_parser.add_argument(
+        "profiles",
+        type=Path,
+        nargs="*",
+        help="JSON files of profiles, the default profile if none are given",
+    )
+
+    work_parser = subparsers.add_parser("work", help="render queued profiles")
+    work_parser.add_argument(
+        "--lease-duration", type=float, default=300.0, help="seconds per lease"
+    )
+    work_parser.add_argument(
+        "--until-empty", action="store_true", help="stop once no job is due"
+    )
+    work_parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=None,
+        help="write metrics of all jobs in the Prometheus text format to this path",
+    )
+
+    subparsers.add_parser("stats", help="show queue statistics")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    queue = SQLiteRenderQueue(args.queue)
+    if args.command == "enqueue":
+        profiles = [
+            Profile.model_validate_json(path.read_bytes()) for path in args.profiles
+        ] or [_load_profile()]
+        for profile in profiles:
+            queue.enqueue(profile)
+    elif args.command == "work":
+        run_worker(
+            queue,
+            lease_duration=args.lease_duration,
+            until_empty=args.until_empty,
+            metrics_path=args.metrics,
+        )
+    else:
+        stats = queue.stats()
+        logger.info(
+            "jobs: %s | throughput: %.2f jobs/min | mean render duration: %s",
+            ", ".join(f"{status}={count}" for status, count in stats.jobs.items()),
+            stats.throughput * 60,
+            f"{stats.mean_render_duration:.2f}s"
+            if stats.mean_render_duration is not None
+            else "n/a",
+        )
+
+
+def run_worker(
+    queue: RenderQueue,
+    worker_id: str | None = None,
+    lease_duration: float = 300.0,
+    poll_interval: float = 1.0,
+    until_empty: bool = False,
+    metrics_path: Path | None = None,
+) -> int:
+    """Render leased jobs until stopped, returns the number of processed jobs
+
+    If `metrics_path` is given, the metrics of all jobs so far are written to it after
+    each job, continuing from the metrics an earlier worker wrote there.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    metrics = RenderMetrics.read(metrics_path) if metrics_path else RenderMetrics()
+    processed = 0
+    while True:
+        job = queue.lease(worker_id, lease_duration)
+        if job is None:
+            if until_empty:
+                return processed
+            time.sleep(poll_interval)
+            continue
+
+        logger.info("Rendering job %d (attempt %d)", job.id, job.attempts)
+        start = time.perf_counter()
+        tracer = Tracer()
+        try:
+            target = io.BytesIO()
+            with tracer.span(
+                "render_html_template",
+                cache="render_context",
+                cache_hit=render_context_cached(job.profile),
+            ):
+                html_content = _render_html_template(job.profile)
+            _render_pdf(target, html_content, tracer=tracer)
+        except Exception as exception:
+            logger.exception("Rendering job %d failed", job.id)
+            metrics.observe_failure(tracer)
+            queue.fail(job.id, worker_id, repr(exception))
+        else:
+            render_duration = time.perf_counter() - start
+            metrics.observe(tracer, target.getvalue())
+            if not queue.complete(
+                job.id, worker_id, target.getvalue(), render_duration
+            ):
+                logger.warning("Lease of job %d expired before it completed", job.id)
+        processed += 1
+        if metrics_path:
+            metrics.write(metrics_path)
@@ -0,0 +1,16 @@
+import shutil
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def font_subset_cache(tmp_path_factory, monkeypatch):
+    """Keep renders of tests out of the developer's font subset cache"""
+    directory = tmp_path_factory.mktemp("cache")
+    monkeypatch.setattr("profile_pdf.CACHE_DIR", directory)
+    return directory / "font_subsets"
+
+
+def pytest_runtest_setup(item: pytest.Item) -> None:
+    if item.get_closest_marker("requires_qpdf") and shutil.which("qpdf") is None:
+        pytest.skip("qpdf isn't installed")
@@ -0,0 +1,61 @@
+import json
+import time
+
+import pytest
+
+from profile_pdf.deadline import (
+    DeadlineExceededError,
+    LastKnownGoodStore,
+    run_with_deadline,
+)
+from profile_pdf.models import Profile
+
+
+def test_run_with_deadline():
+    assert run_with_deadline(sum, ([1, 2, 3],), deadline=10) == 6
+
+
+def test_run_with_deadline_exceeded():
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceededError):
+        run_with_deadline(time.sleep, (30,), deadline=0.5)
+    # the render process was killed instead of waited for
+    assert time.perf_counter() - start < 10
+
+
+def test_run_with_deadline_reraises():
+    with pytest.raises(ValueError, match="invalid literal"):
+        run_with_deadline(int, ("not a number",), deadline=10)
+
+
+def test_last_known_good_store(tmp_path):
+    store = LastKnownGoodStore(tmp_path)
+    key = store.key(Profile(), linearize=False)
+
+    assert store.load(key) is None
+    store.save(key, b"%PDF-all")
+
+    assert store.load(key) == b"%PDF-all"
+    assert store.load(store.key(Profile(), linearize=False)) == b"%PDF-all"
+
+
+def test_last_known_good_store_key():
+    key = LastKnownGoodStore.key(Profile(), linearize=False)
+
+    assert key == LastKnownGoodStore.key(Profile(), pages=None, linearize=False)
+    assert key != LastKnownGoodStore.key(Profile(phone="+49 123"), linearize=False)
+    assert key != LastKnownGoodStore.key(Profile(), linearize=True)
+    assert key != LastKnownGoodStore.key(Profile(), pages=[0], linearize=False)
+    assert LastKnownGoodStore.key(Profile(), pages=range(1)) == (
+        LastKnownGoodStore.key(Profile(), pages=[0])
+    )
+
+
+def test_last_known_good_store_records_timeouts(tmp_path):
+    store = LastKnownGoodStore(tmp_path)
+    key = store.key(Profile())
+    store.record_timeout(key, deadline=2.5)
+    store.record_timeout(key, deadline=5)
+
+    lines = (tmp_path / "timeouts.jsonl").read_text().splitlines()
+    assert [json.loads(line)["deadline"] for line in lines] == [2.5, 5]
@@ -0,0 +1,59 @@
+import io
+
+from PIL import Image
+
+from profile_pdf.draft import placeholder_images
+
+
+def _jpeg(width: int, height: int, orientation: int | None = None) -> bytes:
+    image = Image.new("RGB", (width, height), "orange")
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def _fetcher(result: dict):
+    def url_fetcher(url: str, *args, **kwargs) -> dict:
+        return dict(result)
+
+    return url_fetcher
+
+
+def test_placeholder_images():
+    fetch = placeholder_images(
+        _fetcher({"string": _jpeg(30, 20), "mime_type": "image/jpeg"})
+    )
+
+    result = fetch("file:///media/logo.jpeg")
+
+    assert result["mime_type"] == "image/svg+xml"
+    assert b'width="30" height="20"' in result["string"]
+    assert result["redirected_url"] == "file:///media/logo.jpeg"
+
+
+def test_placeholder_images_from_file_object():
+    fetch = placeholder_images(
+        _fetcher({"file_obj": io.BytesIO(_jpeg(30, 20)), "mime_type": "image/jpeg"})
+    )
+
+    assert b'width="30" height="20"' in fetch("file:///media/logo.jpeg")["string"]
+
+
+def test_placeholder_images_applies_exif_orientation():
+    fetch = placeholder_images(
+        _fetcher({"string": _jpeg(30, 20, orientation=6), "mime_type": "image/jpeg"})
+    )
+
+    assert b'width="20" height="30"' in fetch("file:///media/photo.jpeg")["string"]
+
+
+def test_placeholder_images_keeps_other_resources():
+    for result in [
+        {"string": b"body {}", "mime_type": "text/css"},
+        {"string": b"<svg/>", "mime_type": "image/svg+xml"},
+    ]:
+        fetch = placeholder_images(_fetcher(result))
+        assert fetch("file:///styles/base.css") == result
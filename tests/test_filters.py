@@ -1,7 +1,7 @@
 import pytest
 
-from profile_pdf.generate import _format_duration
 from profile_pdf.models import Education, WorkExperience
+from profile_pdf.view_models import _format_duration
 
 
 @pytest.mark.parametrize(
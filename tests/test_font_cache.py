@@ -0,0 +1,105 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+import weasyprint.pdf.fonts
+
+from profile_pdf.font_cache import FontSubsetCache, cached_font_subsets
+from profile_pdf.tracing import Tracer
+
+
+def test_get_and_put(tmp_path):
+    cache = FontSubsetCache(tmp_path)
+    key = cache.key(b"font", 0, [3, 1, 2], hinting=False)
+
+    assert cache.get(key) is None
+    cache.put(key, b"subset")
+
+    assert cache.get(key) == b"subset"
+
+
+def test_default_directory(font_subset_cache):
+    assert FontSubsetCache().directory == font_subset_cache
+
+
+def test_key():
+    key = FontSubsetCache.key(b"font", 0, [1, 2], hinting=False)
+
+    assert key == FontSubsetCache.key(b"font", 0, {2: "b", 1: "a"}, hinting=False)
+    assert key != FontSubsetCache.key(b"other font", 0, [1, 2], hinting=False)
+    assert key != FontSubsetCache.key(b"font", 1, [1, 2], hinting=False)
+    assert key != FontSubsetCache.key(b"font", 0, [1, 2, 3], hinting=False)
+    assert key != FontSubsetCache.key(b"font", 0, [1, 2], hinting=True)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = FontSubsetCache(tmp_path, max_bytes=30)
+    for mtime, key in enumerate(["a", "b", "c"], start=1000):
+        cache.put(key, b"x" * 10)
+        # spread the modification times, the file system's resolution may be coarse
+        os.utime(tmp_path / f"{key}.font", (mtime, mtime))
+    cache.get("a")
+
+    cache.put("d", b"x" * 10)
+
+    assert sorted(path.stem for path in tmp_path.iterdir()) == ["a", "c", "d"]
+
+
+@pytest.fixture
+def subset_calls(monkeypatch) -> list:
+    calls = []
+
+    def subset(font, cmap, hinting):
+        calls.append(sorted(cmap))
+        if cmap:
+            font.file_content = b"subset of " + font.file_content
+
+    monkeypatch.setattr(weasyprint.pdf.fonts.Font, "subset", subset)
+    return calls
+
+
+def _font() -> SimpleNamespace:
+    return SimpleNamespace(file_content=b"font", index=0, family=b"PT Sans")
+
+
+def test_cached_font_subsets(tmp_path, subset_calls):
+    tracer = Tracer()
+    cache = FontSubsetCache(tmp_path)
+
+    with cached_font_subsets(cache, tracer):
+        first, second = _font(), _font()
+        weasyprint.pdf.fonts.Font.subset(first, {1: "a", 2: "b"}, hinting=False)
+        weasyprint.pdf.fonts.Font.subset(second, {2: "b", 1: "a"}, hinting=False)
+
+    assert first.file_content == second.file_content == b"subset of font"
+    assert subset_calls == [[1, 2]]
+    assert [
+        (span.name, span.attributes["cache"], span.attributes["cache_hit"])
+        for span in tracer.spans
+    ] == [("subset_font", "font_subset", False), ("subset_font", "font_subset", True)]
+    assert tracer.spans[0].attributes["font"] == "PT Sans"
+
+
+def test_cached_font_subsets_without_glyphs(tmp_path, subset_calls):
+    tracer = Tracer()
+    font = _font()
+
+    with cached_font_subsets(FontSubsetCache(tmp_path), tracer):
+        weasyprint.pdf.fonts.Font.subset(font, {}, hinting=False)
+
+    assert font.file_content == b"font"
+    assert subset_calls == [[]]
+    assert not tracer.spans
+    assert not list(tmp_path.iterdir())
+
+
+def test_cached_font_subsets_restores_subsetting(tmp_path, subset_calls):
+    subset = weasyprint.pdf.fonts.Font.subset
+
+    with (
+        pytest.raises(RuntimeError),
+        cached_font_subsets(FontSubsetCache(tmp_path)),
+    ):
+        raise RuntimeError
+
+    assert weasyprint.pdf.fonts.Font.subset is subset
@@ -1,9 +1,30 @@
+import argparse
 import datetime
+import io
 import zoneinfo
 
+import pytest
 from pypdf import PdfReader
 
-from profile_pdf.generate import _main
+from profile_pdf.deadline import DeadlineExceededError, LastKnownGoodStore
+from profile_pdf.font_cache import FontSubsetCache
+from profile_pdf.generate import (
+    ALL_SECTIONS,
+    Section,
+    _generate,
+    _main,
+    _parse_page_range,
+    _render_html_template,
+    _render_pdf,
+    _render_with_deadline,
+    _sections_for_pages,
+    _update_previous_render,
+)
+from profile_pdf.linearize import check_linearization
+from profile_pdf.models import Profile
+from profile_pdf.output import read_manifest, write_artifact
+from profile_pdf.synthetic import synthetic_profile
+from profile_pdf.tracing import Tracer
 
 
 def test_generate():
@@ -35,3 +56,280 @@ def test_generate():
     assert "mathematics" in last_page_text
     today = datetime.datetime.now(tz=zoneinfo.ZoneInfo("Europe/Berlin")).date()
     assert f"last updated: {today.isoformat()}" in last_page_text
+
+
+def test_generate_cover_page_only():
+    buffer = _main(pages=range(1))
+
+    pdf_reader = PdfReader(buffer)
+    assert len(pdf_reader.pages) == 1
+
+    first_page_text = pdf_reader.pages[0].extract_text().lower()
+    assert "martin winkel" in first_page_text
+    assert "work experience" not in first_page_text
+    # the company logos of the pruned experiences aren't embedded anymore
+    assert len(pdf_reader.pages[0].images) == 3
+
+
+def test_generate_page_range():
+    buffer = _main(pages=range(1, 2))
+
+    pdf_reader = PdfReader(buffer)
+    assert len(pdf_reader.pages) == 1
+    assert "work experience" in pdf_reader.pages[0].extract_text().lower()
+
+
+@pytest.mark.requires_qpdf
+def test_generate_linearized():
+    buffer = _main(linearize=True)
+
+    parameters = check_linearization(buffer.getvalue())
+    assert parameters.pages == len(PdfReader(buffer).pages)
+
+
+def test_generate_draft():
+    buffer = _main(draft=True)
+
+    pdf_reader = PdfReader(buffer)
+    # the bundled fonts are installed in the test image, so pages break the same way
+    assert len(pdf_reader.pages) == len(PdfReader(_main()).pages)
+    assert "martin winkel" in pdf_reader.pages[0].extract_text().lower()
+    # images are replaced by vector placeholders
+    assert not pdf_reader.pages[0].images
+
+
+def test_generate_page_range_exceeds_document():
+    with pytest.raises(ValueError, match="page range exceeds the document"):
+        _main(pages=range(99, 100))
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("1", range(1)),
+        ("2-4", range(1, 4)),
+        ("3-3", range(2, 3)),
+    ],
+)
+def test_parse_page_range(value, expected):
+    assert _parse_page_range(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0", "a", "3-2", "1-b", ""])
+def test_parse_page_range_invalid(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        _parse_page_range(value)
+
+
+@pytest.mark.parametrize(
+    ("pages", "expected"),
+    [
+        (None, ALL_SECTIONS),
+        (range(1), {Section.COVER_PAGE}),
+        (range(2), ALL_SECTIONS),
+        (range(1, 3), ALL_SECTIONS),
+    ],
+)
+def test_sections_for_pages(pages, expected):
+    assert _sections_for_pages(pages) == expected
+
+
+def test_generate_long_history():
+    target = io.BytesIO()
+    _render_pdf(target, _render_html_template(synthetic_profile(40)))
+
+    pdf_reader = PdfReader(target)
+    assert len(pdf_reader.pages) > 10
+    text = "".join(page.extract_text() for page in pdf_reader.pages)
+    assert all(f"#{i}" in text for i in range(1, 41))
+
+    # education is kept together with its headline on the last page
+    last_page_text = pdf_reader.pages[-1].extract_text().lower()
+    assert "education" in last_page_text
+    assert "mathematics" in last_page_text
+
+
+def test_render_pdf_reuses_font_subsets(tmp_path):
+    font_cache = FontSubsetCache(tmp_path)
+    html_content = _render_html_template(Profile())
+    first, second = io.BytesIO(), io.BytesIO()
+
+    _render_pdf(first, html_content, font_cache=font_cache)
+    tracer = Tracer()
+    _render_pdf(second, html_content, tracer=tracer, font_cache=font_cache)
+
+    assert list(tmp_path.glob("*.font"))
+    subset_spans = [span for span in tracer.spans if span.name == "subset_font"]
+    assert subset_spans
+    assert all(span.attributes["cache_hit"] for span in subset_spans)
+    assert len(PdfReader(second).pages) == len(PdfReader(first).pages)
+
+
+def test_render_with_deadline(tmp_path, font_subset_cache):
+    store = LastKnownGoodStore(tmp_path)
+    profile = Profile()
+    tracer = Tracer()
+
+    result = _render_with_deadline(profile, deadline=120, tracer=tracer, store=store)
+
+    assert not result.stale
+    assert len(PdfReader(io.BytesIO(result.pdf)).pages) >= 3
+    assert any(span.name == "render_pdf" for span in tracer.spans)
+    # the render process uses the font subset cache of the test, too
+    assert list(font_subset_cache.glob("*.font"))
+
+
+def test_render_with_deadline_falls_back_to_last_known_good(tmp_path):
+    store = LastKnownGoodStore(tmp_path)
+    profile = Profile()
+    store.save(store.key(profile, linearize=False), b"%PDF-last-known-good")
+
+    result = _render_with_deadline(profile, deadline=0.001, store=store)
+
+    assert result.stale
+    assert result.pdf == b"%PDF-last-known-good"
+    assert (tmp_path / "timeouts.jsonl").exists()
+
+
+def test_render_with_deadline_falls_back_to_same_linearization(tmp_path):
+    store = LastKnownGoodStore(tmp_path)
+    profile = Profile()
+    store.save(store.key(profile, linearize=False), b"%PDF-last-known-good")
+
+    with pytest.raises(DeadlineExceededError):
+        _render_with_deadline(profile, deadline=0.001, store=store, linearize=True)
+
+
+def test_render_with_deadline_without_last_known_good(tmp_path):
+    store = LastKnownGoodStore(tmp_path)
+    with pytest.raises(DeadlineExceededError):
+        _render_with_deadline(Profile(), deadline=0.001, store=store)
+
+
+def test_update_previous_render(tmp_path, monkeypatch):
+    # all digits of the new date are in the previous one, so they're in the subset
+    previous, today = datetime.date(2025, 10, 20), datetime.date(2025, 10, 21)
+    monkeypatch.setattr("profile_pdf.generate._today", lambda: previous)
+    path = tmp_path / "profile.pdf"
+    pdf = _main().getvalue()
+    write_artifact(
+        path, pdf, input_digest="abc", render_duration=1.0, last_updated=previous
+    )
+    tracer = Tracer()
+
+    updated = _update_previous_render(path, "abc", today, tracer=tracer)
+
+    assert updated is not None
+    assert updated.startswith(pdf)
+    pdf_reader = PdfReader(io.BytesIO(updated))
+    last_page_text = pdf_reader.pages[-1].extract_text().lower()
+    assert "last updated: 2025-10-21" in last_page_text
+    assert "2025-10-20" not in last_page_text
+    assert [span.name for span in tracer.spans] == ["patch_last_updated"]
+
+
+def test_update_previous_render_on_the_same_day(tmp_path):
+    today = datetime.date(2025, 10, 21)
+    path = tmp_path / "profile.pdf"
+    write_artifact(
+        path, b"%PDF-", input_digest="abc", render_duration=1.0, last_updated=today
+    )
+
+    assert _update_previous_render(path, "abc", today) == b"%PDF-"
+
+
+@pytest.mark.parametrize(
+    ("digest", "stale", "last_updated"),
+    [
+        ("changed", False, datetime.date(2025, 10, 21)),
+        ("abc", True, datetime.date(2025, 10, 21)),
+        ("abc", True, None),
+    ],
+)
+def test_update_previous_render_needs_full_render(
+    tmp_path, digest, stale, last_updated
+):
+    path = tmp_path / "profile.pdf"
+    write_artifact(
+        path,
+        b"%PDF-",
+        input_digest="abc",
+        render_duration=1.0,
+        stale=stale,
+        last_updated=last_updated,
+    )
+
+    assert _update_previous_render(path, digest, datetime.date(2025, 10, 21)) is None
+
+
+def test_update_previous_render_without_date(tmp_path):
+    path = tmp_path / "profile.pdf"
+    write_artifact(path, b"%PDF-", input_digest="abc", render_duration=1.0)
+
+    assert _update_previous_render(path, "abc", datetime.date(2025, 10, 21)) == (
+        b"%PDF-"
+    )
+
+
+def test_update_previous_render_without_previous_render(tmp_path):
+    path = tmp_path / "profile.pdf"
+    assert _update_previous_render(path, "abc", datetime.date(2025, 10, 21)) is None
+
+
+def test_generate_reuses_unchanged_render(tmp_path):
+    path = tmp_path / "profile.pdf"
+    profile = Profile()
+    store = LastKnownGoodStore(tmp_path / "last_known_good")
+
+    first, first_outcome = _generate(profile, path, Tracer(), store=store)
+    tracer = Tracer()
+    second, second_outcome = _generate(profile, path, tracer, store=store)
+
+    assert (first_outcome, second_outcome) == ("rendered", "reused")
+    assert second.pdf == first.pdf == path.read_bytes()
+    assert store.load(store.key(profile, linearize=False)) == first.pdf
+    (span,) = [span for span in tracer.spans if span.name == "update_previous_render"]
+    assert span.attributes["cache_hit"] is True
+
+
+def test_generate_keeps_no_draft_as_last_known_good(tmp_path):
+    store = LastKnownGoodStore(tmp_path / "last_known_good")
+
+    _generate(Profile(), tmp_path / "profile.pdf", Tracer(), draft=True, store=store)
+
+    assert not list(store.directory.glob("*.pdf"))
+
+
+def test_generate_reuses_render_without_date(tmp_path, monkeypatch):
+    path = tmp_path / "profile.pdf"
+    store = LastKnownGoodStore(tmp_path / "last_known_good")
+    monkeypatch.setattr(
+        "profile_pdf.generate._today", lambda: datetime.date(2025, 10, 20)
+    )
+    first, _ = _generate(Profile(), path, Tracer(), pages=range(1), store=store)
+    assert read_manifest(tmp_path).artifacts["profile.pdf"].last_updated is None
+
+    monkeypatch.setattr(
+        "profile_pdf.generate._today", lambda: datetime.date(2025, 10, 21)
+    )
+    second, outcome = _generate(Profile(), path, Tracer(), pages=range(1), store=store)
+
+    assert outcome == "reused"
+    assert second.pdf == first.pdf
+
+
+def test_generate_renders_again_after_renderer_upgrade(tmp_path, monkeypatch):
+    path = tmp_path / "profile.pdf"
+    store = LastKnownGoodStore(tmp_path / "last_known_good")
+    monkeypatch.setattr(
+        "profile_pdf.generate._main", lambda *args, **kwargs: io.BytesIO(b"%PDF-")
+    )
+    monkeypatch.setattr("profile_pdf.generate._renderer_version", lambda: "old")
+    _generate(Profile(), path, Tracer(), store=store)
+    _, outcome = _generate(Profile(), path, Tracer(), store=store)
+    assert outcome == "reused"
+
+    monkeypatch.setattr("profile_pdf.generate._renderer_version", lambda: "new")
+    _, outcome = _generate(Profile(), path, Tracer(), store=store)
+
+    assert outcome == "rendered"
@@ -0,0 +1,118 @@
+import datetime
+import io
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DictionaryObject, NameObject, StreamObject
+
+from profile_pdf.incremental import (
+    MAX_REVISIONS,
+    PatchError,
+    patch_last_updated,
+    prints_last_updated,
+)
+
+PREVIOUS = datetime.date(2025, 10, 18)
+TODAY = datetime.date(2025, 10, 19)
+
+
+def _pdf(text: str, glyphs: str | None = None) -> bytes:
+    """PDF that shows `text` like WeasyPrint does, with a subset of `glyphs`"""
+    glyphs = glyphs if glyphs is not None else text
+    codes = {char: index + 1 for index, char in enumerate(sorted(set(glyphs)))}
+    to_unicode = StreamObject()
+    to_unicode.set_data(
+        b"1 begincodespacerange\n<0000> <ffff>\nendcodespacerange\n"
+        + f"{len(codes)} beginbfchar\n".encode()
+        + b"".join(
+            f"<{code:04x}> <{ord(char):04x}>\n".encode() for char, code in codes.items()
+        )
+        + b"endbfchar\n"
+    )
+
+    writer = PdfWriter()
+    writer.add_blank_page(width=595, height=842)
+    page = writer.add_blank_page(width=595, height=842)
+    font = DictionaryObject(
+        {
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type0"),
+            NameObject("/BaseFont"): NameObject("/PTSans-Regular"),
+            NameObject("/Encoding"): NameObject("/Identity-H"),
+            NameObject("/ToUnicode"): writer._add_object(to_unicode),
+        }
+    )
+    page[NameObject("/Resources")] = DictionaryObject(
+        {
+            NameObject("/Font"): DictionaryObject(
+                {NameObject("/f1"): writer._add_object(font)}
+            )
+        }
+    )
+    # glyph position adjustments are written between glyphs, like kerning
+    hex_codes = [f"{codes[char]:04x}" for char in text]
+    shown = "<" + ">-3<".join(hex_codes) + ">"
+    content = StreamObject()
+    content.set_data(f"BT /f1 11 Tf 1 0 0 -1 40 800 Tm [{shown}] TJ ET".encode())
+    page[NameObject("/Contents")] = writer._add_object(content)
+
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _last_page_text(pdf: bytes) -> str:
+    return PdfReader(io.BytesIO(pdf)).pages[-1].extract_text()
+
+
+def test_patch_last_updated():
+    pdf = _pdf("Last updated: 2025-10-18", glyphs="Last updated: 0123456789-")
+
+    patched = patch_last_updated(pdf, PREVIOUS, TODAY)
+
+    # the previous revision is kept unchanged, the update is appended
+    assert patched.startswith(pdf)
+    assert "Last updated: 2025-10-19" in _last_page_text(patched)
+    assert len(PdfReader(io.BytesIO(patched)).pages) == 2
+
+
+def test_patch_last_updated_missing_glyph():
+    pdf = _pdf("Last updated: 2025-10-18")
+
+    with pytest.raises(PatchError, match="no glyph for '9'"):
+        patch_last_updated(pdf, PREVIOUS, TODAY)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Last updated: 2025-10-17",
+        "Last updated: 2025-10-18 Last updated: 2025-10-18",
+    ],
+)
+def test_patch_last_updated_needs_exactly_one_date(text):
+    pdf = _pdf(text, glyphs=text + "9")
+
+    with pytest.raises(PatchError, match="instead of once"):
+        patch_last_updated(pdf, PREVIOUS, TODAY)
+
+
+def test_patch_last_updated_limits_revisions():
+    pdf = _pdf("Last updated: 2025-10-18", glyphs="Last updated: 0123456789-")
+    dates = [PREVIOUS, TODAY]
+    for day in range(MAX_REVISIONS - 1):
+        pdf = patch_last_updated(pdf, dates[day % 2], dates[(day + 1) % 2])
+
+    with pytest.raises(PatchError, match="revisions"):
+        patch_last_updated(pdf, dates[1], dates[0])
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("Last updated: 2025-10-18", True),
+        ("Mathematics, 2010-2015", False),
+    ],
+)
+def test_prints_last_updated(text, expected):
+    assert prints_last_updated(_pdf(text)) is expected
@@ -0,0 +1,100 @@
+import io
+import subprocess
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from profile_pdf.linearize import (
+    LinearizationError,
+    check_linearization,
+    linearization_parameters,
+    linearize,
+)
+
+LINEARIZED_HEADER = (
+    b"%PDF-1.7\n%\xbf\xf7\xa2\xfe\n"
+    b"1 0 obj\n<< /Linearized 1 /L 4242 /H [ 700 150 ] /O 4 /E 2100 /N 3 /T 4000 >>\n"
+    b"endobj\n"
+)
+
+
+def _pdf(pages: int = 3) -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=595, height=842)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_linearization_parameters():
+    parameters = linearization_parameters(LINEARIZED_HEADER)
+
+    assert parameters is not None
+    assert parameters.file_length == 4242
+    assert parameters.hint_stream_offset == 700
+    assert parameters.hint_stream_length == 150
+    assert parameters.first_page_object == 4
+    assert parameters.first_page_end == 2100
+    assert parameters.pages == 3
+    assert parameters.main_xref_offset == 4000
+
+
+def test_linearization_parameters_of_plain_pdf():
+    assert linearization_parameters(_pdf()) is None
+
+
+def test_linearization_parameters_incomplete():
+    with pytest.raises(LinearizationError, match="incomplete"):
+        linearization_parameters(LINEARIZED_HEADER.replace(b" /E 2100", b""))
+
+
+def test_check_linearization_of_plain_pdf():
+    with pytest.raises(LinearizationError, match="no linearization dictionary"):
+        check_linearization(_pdf())
+
+
+def test_check_linearization_length_mismatch():
+    with pytest.raises(LinearizationError, match="doesn't match"):
+        check_linearization(LINEARIZED_HEADER)
+
+
+@pytest.mark.requires_qpdf
+def test_linearize():
+    pdf = _pdf()
+
+    linearized = linearize(pdf)
+
+    parameters = check_linearization(linearized)
+    assert parameters.pages == 3
+    assert parameters.first_page_end < len(linearized)
+    assert len(PdfReader(io.BytesIO(linearized)).pages) == 3
+    # identical input gives identical output
+    assert linearize(pdf) == linearized
+
+
+@pytest.mark.requires_qpdf
+def test_check_linearization_after_incremental_update():
+    linearized = linearize(_pdf())
+    writer = PdfWriter(io.BytesIO(linearized), incremental=True)
+    writer.add_metadata({"/Title": "updated"})
+    buffer = io.BytesIO()
+    writer.write(buffer)
+
+    with pytest.raises(LinearizationError):
+        check_linearization(buffer.getvalue())
+
+
+def test_check_linearization_fails_on_qpdf_warnings(monkeypatch):
+    def run(args, **kwargs):
+        return subprocess.CompletedProcess(
+            args, 3, stdout="", stderr="WARNING: page offset hint table: bad"
+        )
+
+    monkeypatch.setattr("profile_pdf.linearize.shutil.which", lambda name: name)
+    monkeypatch.setattr("profile_pdf.linearize.subprocess.run", run)
+    # pad to the length in the linearization dictionary
+    pdf = LINEARIZED_HEADER.ljust(4242, b"\n")
+
+    with pytest.raises(LinearizationError, match="page offset hint table: bad"):
+        check_linearization(pdf)
@@ -0,0 +1,130 @@
+from profile_pdf.metrics import Histogram, RenderMetrics
+from profile_pdf.tracing import Tracer
+
+
+def _tracer(draft: bool = False, cache_hit: bool = False) -> Tracer:
+    tracer = Tracer()
+    with tracer.span(
+        "render_html_template", cache="render_context", cache_hit=cache_hit
+    ):
+        pass
+    with tracer.span("render_pdf", draft=draft) as span:
+        with tracer.span("fetch", url="file:///logo.png", mime_type="image/png") as f:
+            f.attributes["bytes"] = 1000
+        with tracer.span("fetch", url="file:///font.ttf", mime_type="font/ttf") as f:
+            f.attributes["bytes"] = 5000
+        span.attributes["pages"] = 3
+    return tracer
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert histogram.bucket_counts == [1, 2]
+    assert histogram.count == 3
+    assert histogram.sum == 5.55
+
+
+def test_render_metrics():
+    metrics = RenderMetrics()
+    metrics.observe(_tracer(cache_hit=False), b"%PDF-1234")
+    metrics.observe(_tracer(cache_hit=True), b"%PDF-", outcome="reused")
+    metrics.observe_failure()
+
+    text = metrics.to_text()
+
+    assert "# TYPE profile_pdf_stage_duration_seconds histogram" in text
+    assert (
+        'profile_pdf_stage_duration_seconds_bucket{stage="render_pdf",le="+Inf"} 2'
+        in text
+    )
+    assert 'profile_pdf_stage_duration_seconds_count{stage="fetch"} 4' in text
+    assert 'profile_pdf_renders_total{outcome="rendered"} 1' in text
+    assert 'profile_pdf_renders_total{outcome="reused"} 1' in text
+    assert "profile_pdf_render_failures_total 1" in text
+    assert "profile_pdf_pages_total 6" in text
+    assert "profile_pdf_output_bytes_total 14" in text
+    assert "profile_pdf_image_bytes_total 2000" in text
+    assert (
+        'profile_pdf_cache_requests_total{cache="render_context",result="hit"} 1'
+        in text
+    )
+    assert (
+        'profile_pdf_cache_requests_total{cache="render_context",result="miss"} 1'
+        in text
+    )
+    assert "profile_pdf_last_success_timestamp_seconds " in text
+    assert text.endswith("\n")
+
+
+def test_render_metrics_without_renders():
+    text = RenderMetrics().to_text()
+
+    assert "profile_pdf_render_failures_total 0" in text
+    assert "last_run_timestamp_seconds" not in text
+
+
+def test_render_metrics_of_drafts_count_no_image_bytes():
+    metrics = RenderMetrics()
+    metrics.observe(_tracer(draft=True), b"%PDF-")
+
+    assert "profile_pdf_image_bytes_total 0" in metrics.to_text()
+
+
+def test_render_metrics_escape_label_values():
+    metrics = RenderMetrics()
+    tracer = Tracer()
+    with tracer.span('say "hi"\\'):
+        pass
+    metrics.observe(tracer, b"")
+
+    assert 'stage="say \\"hi\\"\\\\"' in metrics.to_text()
+
+
+def test_write(tmp_path):
+    metrics = RenderMetrics()
+    metrics.observe(_tracer(), b"%PDF-")
+    path = tmp_path / "textfile" / "profile_pdf.prom"
+
+    metrics.write(path)
+
+    assert path.read_text() == metrics.to_text()
+    # only the metrics file is left, no temporary files the collector could pick up
+    assert [p.name for p in path.parent.iterdir()] == ["profile_pdf.prom"]
+
+
+def test_read_continues_from_written_metrics(tmp_path):
+    path = tmp_path / "profile_pdf.prom"
+    metrics = RenderMetrics()
+    metrics.observe(_tracer(), b"%PDF-")
+    tracer = Tracer()
+    with tracer.span('say "hi"\\\n'):
+        pass
+    metrics.observe_failure(tracer)
+    metrics.write(path)
+
+    read = RenderMetrics.read(path)
+
+    assert read.to_text() == metrics.to_text()
+    read.observe(_tracer(cache_hit=True), b"%PDF-")
+    text = read.to_text()
+    assert 'profile_pdf_renders_total{outcome="rendered"} 2' in text
+    assert "profile_pdf_render_failures_total 1" in text
+    assert "profile_pdf_pages_total 6" in text
+    assert 'profile_pdf_stage_duration_seconds_count{stage="render_pdf"} 2' in text
+
+
+def test_read_without_previous_metrics(tmp_path):
+    assert RenderMetrics.read(tmp_path / "missing.prom").to_text() == (
+        RenderMetrics().to_text()
+    )
+
+
+def test_read_unreadable_metrics(tmp_path):
+    path = tmp_path / "profile_pdf.prom"
+    path.write_text("garbage\n")
+
+    assert RenderMetrics.read(path).to_text() == RenderMetrics().to_text()
@@ -0,0 +1,72 @@
+import threading
+
+from profile_pdf.models import Profile
+from profile_pdf.output import (
+    MANIFEST_FILENAME,
+    atomic_write_bytes,
+    input_digest,
+    read_manifest,
+    write_artifact,
+)
+
+
+def test_atomic_write_bytes(tmp_path):
+    path = tmp_path / "out" / "profile.pdf"
+    atomic_write_bytes(path, b"first")
+    atomic_write_bytes(path, b"second")
+
+    assert path.read_bytes() == b"second"
+    assert path.stat().st_mode & 0o777 == 0o644
+    # no temporary files are left behind
+    assert [p.name for p in path.parent.iterdir()] == ["profile.pdf"]
+
+
+def test_write_artifact(tmp_path):
+    path = tmp_path / "profile.pdf"
+    artifact = write_artifact(path, b"%PDF-", input_digest="abc", render_duration=1.5)
+
+    assert path.read_bytes() == b"%PDF-"
+    manifest = read_manifest(tmp_path)
+    assert manifest.artifacts == {"profile.pdf": artifact}
+    assert artifact.size == 5
+    assert artifact.input_digest == "abc"
+    assert artifact.render_duration == 1.5
+    assert (tmp_path / MANIFEST_FILENAME).exists()
+
+
+def test_write_artifact_keeps_unchanged_file(tmp_path):
+    path = tmp_path / "profile.pdf"
+    write_artifact(path, b"%PDF-", input_digest="abc", render_duration=1.0)
+    mtime = path.stat().st_mtime_ns
+
+    artifact = write_artifact(path, b"%PDF-", input_digest="abc", render_duration=2.0)
+
+    assert path.stat().st_mtime_ns == mtime
+    assert read_manifest(tmp_path).artifacts["profile.pdf"] == artifact
+
+
+def test_write_artifact_concurrently(tmp_path):
+    def write(i):
+        write_artifact(
+            tmp_path / f"profile-{i}.pdf",
+            f"content {i}".encode(),
+            input_digest=str(i),
+            render_duration=0.1,
+        )
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # no update of the manifest got lost
+    assert len(read_manifest(tmp_path).artifacts) == 20
+
+
+def test_input_digest():
+    digest = input_digest(Profile())
+
+    assert input_digest(Profile()) == digest
+    assert input_digest(Profile(phone="+49 123")) != digest
+    assert input_digest(Profile(), pages=range(1)) != digest
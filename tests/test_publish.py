@@ -0,0 +1,70 @@
+import gzip
+
+import brotli
+import pytest
+
+from profile_pdf.publish import STATIC_MANIFEST_FILENAME, publish, read_static_manifest
+
+
+@pytest.fixture
+def directory(tmp_path):
+    (tmp_path / "index.html").write_text("<html>" + "hello world " * 100 + "</html>")
+    (tmp_path / "CNAME").write_text("example.com")
+    (tmp_path / "tiny.txt").write_text("a")
+    (tmp_path / ".manifest.lock").touch()
+    return tmp_path
+
+
+def test_publish(directory):
+    manifest = publish(directory)
+
+    assert set(manifest.assets) == {"index.html", "CNAME", "tiny.txt"}
+    assert read_static_manifest(directory) == manifest
+
+    html = (directory / "index.html").read_bytes()
+    asset = manifest.assets["index.html"]
+    assert asset.content_type == "text/html"
+    assert asset.identity.content_length == len(html)
+    assert gzip.decompress((directory / "index.html.gz").read_bytes()) == html
+    assert brotli.decompress((directory / "index.html.br").read_bytes()) == html
+    assert asset.encodings["gzip"].content_length == len(
+        (directory / "index.html.gz").read_bytes()
+    )
+    # all representations have distinct strong validators
+    etags = [asset.identity.etag] + [r.etag for r in asset.encodings.values()]
+    assert len(set(etags)) == 3
+    assert all(etag.startswith('"') and etag.endswith('"') for etag in etags)
+
+
+def test_publish_skips_incompressible_files(directory):
+    manifest = publish(directory)
+
+    # CNAME isn't a compressible type, tiny.txt doesn't get smaller
+    assert manifest.assets["CNAME"].encodings == {}
+    assert manifest.assets["tiny.txt"].encodings == {}
+    assert not (directory / "CNAME.gz").exists()
+    assert not (directory / "tiny.txt.gz").exists()
+    assert not (directory / STATIC_MANIFEST_FILENAME).with_suffix(".json.gz").exists()
+
+
+def test_publish_skips_unchanged_files(directory):
+    first = publish(directory)
+    variant = directory / "index.html.br"
+    mtime = variant.stat().st_mtime_ns
+
+    assert publish(directory) == first
+    assert variant.stat().st_mtime_ns == mtime
+
+    (directory / "index.html").write_text("<html>" + "changed " * 100 + "</html>")
+    changed = publish(directory)
+    html = (directory / "index.html").read_bytes()
+    assert brotli.decompress(variant.read_bytes()) == html
+    assert changed.assets["index.html"].identity != first.assets["index.html"].identity
+
+
+def test_publish_recompresses_missing_variants(directory):
+    publish(directory)
+    (directory / "index.html.gz").unlink()
+
+    publish(directory)
+    assert (directory / "index.html.gz").exists()
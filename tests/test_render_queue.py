@@ -0,0 +1,169 @@
+import multiprocessing
+
+import pytest
+
+from profile_pdf.models import Profile
+from profile_pdf.render_queue import JobStatus, SQLiteRenderQueue
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = SQLiteRenderQueue(tmp_path / "queue.sqlite3", clock=clock)
+    yield queue
+    queue.close()
+
+
+def test_enqueue_lease_complete(queue):
+    profile = Profile(phone="+49 123")
+    job_id = queue.enqueue(profile)
+
+    job = queue.lease("worker-1", lease_duration=60)
+    assert job is not None
+    assert job.id == job_id
+    assert job.profile == profile
+    assert job.attempts == 1
+    # leased jobs aren't handed out twice
+    assert queue.lease("worker-2", lease_duration=60) is None
+
+    assert queue.complete(job_id, "worker-1", b"%PDF-", render_duration=1.5)
+    result = queue.result(job_id)
+    assert result.status == JobStatus.DONE
+    assert result.pdf == b"%PDF-"
+    assert result.render_duration == 1.5
+
+
+def test_lease_order(queue):
+    first = queue.enqueue(Profile())
+    second = queue.enqueue(Profile())
+
+    assert queue.lease("worker-1", lease_duration=60).id == first
+    assert queue.lease("worker-1", lease_duration=60).id == second
+    assert queue.lease("worker-1", lease_duration=60) is None
+
+
+def test_expired_lease(queue, clock):
+    job_id = queue.enqueue(Profile(), max_attempts=2)
+    queue.lease("worker-1", lease_duration=60)
+
+    clock.now += 61
+    job = queue.lease("worker-2", lease_duration=60)
+    assert job.id == job_id
+    assert job.attempts == 2
+    # the first worker lost its lease
+    assert not queue.complete(job_id, "worker-1", b"%PDF-", render_duration=1.0)
+
+    # the last attempt's lease expired too, so the job is given up
+    clock.now += 61
+    assert queue.lease("worker-3", lease_duration=60) is None
+    assert queue.result(job_id).status == JobStatus.FAILED
+    assert queue.result(job_id).error == "lease expired"
+
+
+def test_retry_with_backoff(queue, clock):
+    job_id = queue.enqueue(Profile(), max_attempts=3)
+
+    queue.lease("worker-1", lease_duration=60)
+    assert queue.fail(job_id, "worker-1", "boom")
+    assert queue.result(job_id).status == JobStatus.QUEUED
+    assert queue.lease("worker-1", lease_duration=60) is None
+
+    clock.now += queue.backoff(1)
+    queue.lease("worker-1", lease_duration=60)
+    assert queue.fail(job_id, "worker-1", "boom")
+
+    clock.now += queue.backoff(2)
+    assert queue.lease("worker-1", lease_duration=60).attempts == 3
+    assert queue.fail(job_id, "worker-1", "boom")
+
+    result = queue.result(job_id)
+    assert result.status == JobStatus.FAILED
+    assert result.error == "boom"
+    assert result.attempts == 3
+
+
+def test_fail_without_lease(queue):
+    job_id = queue.enqueue(Profile())
+    assert not queue.fail(job_id, "worker-1", "boom")
+
+
+def test_backoff(queue):
+    assert [queue.backoff(attempts) for attempts in range(1, 5)] == [5, 10, 20, 40]
+    assert queue.backoff(100) == queue.backoff_max
+
+
+def test_result_of_unknown_job(queue):
+    with pytest.raises(KeyError):
+        queue.result(42)
+
+
+def test_stats(queue, clock):
+    for _ in range(3):
+        queue.enqueue(Profile())
+    for render_duration in (1.0, 3.0):
+        job = queue.lease("worker-1", lease_duration=60)
+        queue.complete(job.id, "worker-1", b"%PDF-", render_duration=render_duration)
+
+    stats = queue.stats(window=60)
+    assert stats.jobs == {
+        JobStatus.QUEUED: 1,
+        JobStatus.LEASED: 0,
+        JobStatus.DONE: 2,
+        JobStatus.FAILED: 0,
+    }
+    assert stats.completed_in_window == 2
+    assert stats.throughput == 2 / 60
+    assert stats.mean_render_duration == 2.0
+
+    clock.now += 61
+    assert queue.stats(window=60).completed_in_window == 0
+
+
+def test_stats_empty_window(queue):
+    job_id = queue.enqueue(Profile())
+    queue.lease("worker-1", lease_duration=60)
+    queue.complete(job_id, "worker-1", b"%PDF-", render_duration=1.0)
+
+    stats = queue.stats(window=0)
+
+    assert stats.completed_in_window == 0
+    assert stats.throughput == 0.0
+
+
+def _lease_all(path, worker_id, leased):
+    queue = SQLiteRenderQueue(path)
+    while (job := queue.lease(worker_id, lease_duration=60)) is not None:
+        leased.put(job.id)
+    queue.close()
+
+
+def test_concurrent_workers(tmp_path):
+    path = tmp_path / "queue.sqlite3"
+    queue = SQLiteRenderQueue(path)
+    job_ids = {queue.enqueue(Profile()) for _ in range(30)}
+
+    leased: multiprocessing.Queue = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_lease_all, args=(path, f"worker-{i}", leased))
+        for i in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    leased_ids = [leased.get(timeout=10) for _ in job_ids]
+    for worker in workers:
+        worker.join()
+
+    # every job was leased exactly once
+    assert sorted(leased_ids) == sorted(job_ids)
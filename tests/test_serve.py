@@ -0,0 +1,151 @@
+import gzip
+import http.client
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from profile_pdf.publish import publish
+from profile_pdf.serve import make_server
+
+HTML = "<html>" + "hello world " * 100 + "</html>"
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "index.html").write_text(HTML)
+    publish(tmp_path)
+    (tmp_path / "unpublished.txt").write_text("not in the manifest")
+
+    server = make_server(tmp_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(
+    server: ThreadingHTTPServer, path: str, headers: dict[str, str] | None = None
+) -> tuple[http.client.HTTPResponse, bytes]:
+    host, port = server.server_address[:2]
+    connection = http.client.HTTPConnection(str(host), int(port))
+    connection.request("GET", path, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_serves_identity(server):
+    response, body = _get(server, "/")
+
+    assert response.status == 200
+    assert body == HTML.encode()
+    assert response.getheader("Content-Encoding") is None
+    assert response.getheader("Content-Length") == str(len(body))
+    assert response.getheader("Vary") == "Accept-Encoding"
+    assert response.getheader("ETag")
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("br;q=0.0, gzip", "gzip"),
+        ("br; q=0.00, gzip;q=0.000", None),
+        ("br;q=0.5, gzip", "gzip"),
+        ("BR;Q=1", "br"),
+        ("*", "br"),
+        ("*;q=0", None),
+        ("*;q=0, gzip", "gzip"),
+        ("br;q=0, *", "gzip"),
+        ("br;q=invalid, gzip;q=0.1", "gzip"),
+        ("gzip;q=0.5, identity", None),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_negotiates_encoding(server, accept_encoding, expected):
+    response, body = _get(
+        server, "/index.html", headers={"Accept-Encoding": accept_encoding}
+    )
+
+    assert response.status == 200
+    assert response.getheader("Content-Encoding") == expected
+    assert response.getheader("Content-Length") == str(len(body))
+    if expected == "gzip":
+        assert gzip.decompress(body) == HTML.encode()
+
+
+def test_conditional_request(server):
+    response, _ = _get(server, "/index.html", headers={"Accept-Encoding": "br"})
+    etag = response.getheader("ETag")
+    assert etag is not None
+
+    response, body = _get(
+        server,
+        "/index.html",
+        headers={"Accept-Encoding": "br", "If-None-Match": etag},
+    )
+    assert response.status == 304
+    assert body == b""
+    assert response.getheader("ETag") == etag
+
+    # the validator of another encoding doesn't match
+    response, _ = _get(
+        server,
+        "/index.html",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert response.status == 200
+
+
+def test_serves_files_outside_the_manifest(server):
+    response, body = _get(server, "/unpublished.txt")
+
+    assert response.status == 200
+    assert body == b"not in the manifest"
+
+
+@pytest.mark.parametrize(
+    "content",
+    ["<html>changed</html>", HTML.replace("hello", "howdy")],
+    ids=["other size", "same size"],
+)
+def test_serves_files_changed_after_publishing(server, tmp_path, content):
+    response, _ = _get(server, "/index.html")
+    etag = response.getheader("ETag")
+    assert etag is not None
+    (tmp_path / "index.html").write_text(content)
+
+    response, body = _get(
+        server,
+        "/index.html",
+        headers={"Accept-Encoding": "br, gzip", "If-None-Match": etag},
+    )
+
+    assert response.status == 200
+    assert body == content.encode()
+    assert response.getheader("Content-Encoding") is None
+    assert response.getheader("Content-Length") == str(len(body))
+    assert response.getheader("ETag") is None
+
+
+def test_throttle(tmp_path):
+    (tmp_path / "index.html").write_text(HTML)
+    server = make_server(tmp_path, throttle=2048)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    start = time.perf_counter()
+    response, body = _get(server, "/", headers={"Accept-Encoding": "identity"})
+    duration = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+
+    assert body == HTML.encode()
+    # at least the first chunk of 1024 bytes is delayed by 0.5s
+    assert duration >= 0.45
@@ -0,0 +1,17 @@
+import pytest
+
+from profile_pdf.models import Profile
+from profile_pdf.synthetic import synthetic_profile
+
+
+@pytest.mark.parametrize("n_experiences", [0, 1, 10, 100])
+def test_synthetic_profile(n_experiences):
+    profile = synthetic_profile(n_experiences)
+
+    assert len(profile.work_experience) == n_experiences
+    assert len({we.title for we in profile.work_experience}) == n_experiences
+    assert profile.education == Profile().education
+
+
+def test_synthetic_profile_is_deterministic():
+    assert synthetic_profile(25) == synthetic_profile(25)
@@ -0,0 +1,93 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from weasyprint.logger import PROGRESS_LOGGER
+
+from profile_pdf.generate import _main
+from profile_pdf.tracing import Tracer, patch_weasyprint, trace_page_layout
+
+
+def test_span_nesting():
+    tracer = Tracer()
+    with tracer.span("outer") as outer, tracer.span("inner", foo="bar") as inner:
+        pass
+
+    assert tracer.spans == [outer, inner]
+    assert outer.parent_span_id is None
+    assert inner.parent_span_id == outer.span_id
+    assert inner.attributes == {"foo": "bar"}
+    assert outer.duration >= inner.duration >= 0
+
+
+def test_export(tmp_path):
+    tracer = Tracer()
+    with tracer.span("outer", pages=3, ratio=0.5, stale=False), tracer.span("inner"):
+        pass
+
+    path = tmp_path / "trace.json"
+    tracer.export(path)
+
+    exported = json.loads(path.read_text())
+    (resource_spans,) = exported["resourceSpans"]
+    (scope_spans,) = resource_spans["scopeSpans"]
+    outer, inner = scope_spans["spans"]
+    assert outer["traceId"] == inner["traceId"] == tracer.trace_id
+    assert "parentSpanId" not in outer
+    assert inner["parentSpanId"] == outer["spanId"]
+    assert outer["attributes"] == [
+        {"key": "pages", "value": {"intValue": "3"}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+        {"key": "stale", "value": {"boolValue": False}},
+    ]
+    assert int(outer["endTimeUnixNano"]) >= int(outer["startTimeUnixNano"])
+
+
+def test_trace_page_layout():
+    level, handlers = PROGRESS_LOGGER.level, list(PROGRESS_LOGGER.handlers)
+    tracer = Tracer()
+    with tracer.span("layout") as layout, trace_page_layout(tracer):
+        PROGRESS_LOGGER.info("Step 5 - Creating layout - Page %d", 1)
+        PROGRESS_LOGGER.info("Step 5 - Creating layout - Page %d (up-to-date)", 2)
+        PROGRESS_LOGGER.info("Step 5 - Creating layout - Page %d", 3)
+
+    page_spans = [span for span in tracer.spans if span.name == "layout_page"]
+    assert [span.attributes["page"] for span in page_spans] == [1, 3]
+    assert all(span.parent_span_id == layout.span_id for span in page_spans)
+    assert all(span.end_time_unix_nano for span in page_spans)
+    assert PROGRESS_LOGGER.level == level
+    assert PROGRESS_LOGGER.handlers == handlers
+
+
+def test_render_spans():
+    tracer = Tracer()
+    _main(tracer=tracer)
+
+    spans_by_name: dict = {}
+    for span in tracer.spans:
+        spans_by_name.setdefault(span.name, []).append(span)
+
+    (render_span,) = spans_by_name["render_pdf"]
+    assert render_span.attributes["pages"] >= 3
+    assert render_span.attributes["boxes"] > 0
+    assert render_span.attributes["images"] > 3
+
+    fetched_urls = {span.attributes["url"] for span in spans_by_name["fetch"]}
+    assert any(url.endswith("PTSans-Regular.ttf") for url in fetched_urls)
+    assert any(url.endswith("photo.jpeg") for url in fetched_urls)
+    assert len(spans_by_name["open_image"]) >= render_span.attributes["images"]
+
+    laid_out_pages = {span.attributes["page"] for span in spans_by_name["layout_page"]}
+    assert laid_out_pages == set(range(1, render_span.attributes["pages"] + 1))
+    assert all(span.end_time_unix_nano for span in tracer.spans)
+
+
+def test_patch_weasyprint_restores_original():
+    owner = SimpleNamespace(function=len)
+
+    with patch_weasyprint(owner, "function", max):
+        assert owner.function is max
+    with pytest.raises(RuntimeError), patch_weasyprint(owner, "function", max):
+        raise RuntimeError
+
+    assert owner.function is len
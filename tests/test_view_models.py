@@ -0,0 +1,47 @@
+from profile_pdf import MEDIA_DIR, view_models
+from profile_pdf.models import Profile
+from profile_pdf.view_models import build_render_context, get_render_context
+
+
+def test_build_render_context():
+    profile = Profile()
+    context = build_render_context(profile)
+
+    assert context.profile_image_url == (MEDIA_DIR / "photo.jpeg").as_uri()
+    assert all(url.startswith("file://") for url in context.icon_urls)
+    assert "Python: 11 years" in context.core_skills[0].technologies
+
+    we_view = context.work_experience[0]
+    we = profile.work_experience[0]
+    assert we_view.title == f"{we.title} ({we.contract_type})"
+    assert we_view.meta == f"{we.company} | {we.start} - {we.end} | {we.location}"
+    assert we_view.logo_url == we.logo.as_uri()
+    for (category, tech_list), (expected_category, expected_tech_list) in zip(
+        we_view.technologies, we.technologies.items(), strict=True
+    ):
+        assert category == expected_category
+        assert tech_list == ", ".join(sorted(expected_tech_list))
+
+    ed_view = context.education[0]
+    ed = profile.education[0]
+    assert ed_view.meta.startswith(f"{ed.field_of_study} | {ed.institution} | ")
+
+
+def test_get_render_context_is_cached():
+    context = get_render_context(Profile())
+
+    # an equal profile reuses the context, a different one doesn't
+    assert get_render_context(Profile()) is context
+    assert get_render_context(Profile(phone="+49 123")) is not context
+
+
+def test_get_render_context_evicts_oldest(monkeypatch):
+    monkeypatch.setattr(view_models, "_render_contexts", {})
+    monkeypatch.setattr(view_models, "MAX_CACHED_CONTEXTS", 2)
+
+    first = get_render_context(Profile(phone="1"))
+    get_render_context(Profile(phone="2"))
+    get_render_context(Profile(phone="3"))
+
+    assert len(view_models._render_contexts) == 2
+    assert get_render_context(Profile(phone="1")) is not first
@@ -0,0 +1,64 @@
+import io
+
+from pypdf import PdfReader
+
+from profile_pdf.models import Profile
+from profile_pdf.render_queue import JobStatus, SQLiteRenderQueue
+from profile_pdf.worker import run_worker
+
+
+def test_run_worker(tmp_path):
+    queue = SQLiteRenderQueue(tmp_path / "queue.sqlite3")
+    job_id = queue.enqueue(Profile(phone="+49 123"))
+
+    assert run_worker(queue, worker_id="worker-1", until_empty=True) == 1
+
+    result = queue.result(job_id)
+    assert result.status == JobStatus.DONE
+    assert result.render_duration is not None
+    assert result.render_duration > 0
+    assert result.pdf is not None
+    first_page_text = PdfReader(io.BytesIO(result.pdf)).pages[0].extract_text()
+    assert "+49 123" in first_page_text
+
+
+def test_run_worker_retries_failures(tmp_path, monkeypatch):
+    def broken_render(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr("profile_pdf.worker._render_pdf", broken_render)
+    queue = SQLiteRenderQueue(tmp_path / "queue.sqlite3", backoff_base=0)
+    job_id = queue.enqueue(Profile(), max_attempts=2)
+
+    assert run_worker(queue, worker_id="worker-1", until_empty=True) == 2
+
+    result = queue.result(job_id)
+    assert result.status == JobStatus.FAILED
+    assert result.attempts == 2
+    assert result.error is not None
+    assert "boom" in result.error
+
+
+def test_run_worker_writes_metrics(tmp_path, monkeypatch):
+    def broken_render(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr("profile_pdf.worker._render_pdf", broken_render)
+    queue = SQLiteRenderQueue(tmp_path / "queue.sqlite3", backoff_base=0)
+    queue.enqueue(Profile(), max_attempts=2)
+    metrics_path = tmp_path / "profile_pdf.prom"
+
+    run_worker(queue, worker_id="worker-1", until_empty=True, metrics_path=metrics_path)
+
+    text = metrics_path.read_text()
+    assert "profile_pdf_render_failures_total 2" in text
+    assert (
+        'profile_pdf_stage_duration_seconds_count{stage="render_html_template"} 2'
+        in text
+    )
+
+    # a restarted worker continues from the written metrics
+    queue.enqueue(Profile(), max_attempts=1)
+    run_worker(queue, worker_id="worker-2", until_empty=True, metrics_path=metrics_path)
+
+    assert "profile_pdf_render_failures_total 3" in metrics_path.read_text()